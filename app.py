@@ -5,225 +5,307 @@
 # - 7/14/30-day dashboard period toggle
 # - Supabase Python v2 compatible (no insert().select("*") chaining)
 # - FIX: If user already answered today, show the SAME saved question in read-only (stored question_id)
+# - Logs window fetched once per rerun (LogRepository), dropped on insert/update
+# - Global dashboard distribution cached process-wide (TTL), invalidated on writes
+# - Storage backend selectable via STORAGE_BACKEND secret: supabase (default) | sqlite
+# - logs updates (save / id repair) written behind the click by a background queue
+# - pandas / altair / supabase imported only on the code paths that use them (fast quiz cold start)
+# - Supabase calls timed per caller; per-rerun totals and a slow-query log (SLOW_QUERY_MS secret)
+# - Opt-in perf panel in the sidebar (?perf=1, or PERF_PANEL / PERF_TOKEN secrets)
+# - Admin-only ?profile=<ADMIN_TOKEN>: cProfile + flamegraph of one rerun, written to PROFILE_DIR
+# - Prometheus-style metrics (step / backend latency, submissions, saves, caches, sessions) on
+#   METRICS_PORT (/metrics) and/or METRICS_FILE
+# - Quiz, inference, recommendation, levels and storage live in the mood_and_move package; this file renders
 
-import json
 import datetime
-import random
+import io
+import re
+import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import altair as alt
 import streamlit as st
-from supabase import create_client, Client
+
+from mood_and_move.cache import TTLCache, cache_stats
+from mood_and_move.catalog import Catalog, load_catalog
+from mood_and_move.concurrency import QueryExecutor
+from mood_and_move.export import FORMATS as EXPORT_FORMATS, MIME_TYPES, export_user
+from mood_and_move.inference import draw_question, get_question, infer_emotion_from_choice, ordered_options
+from mood_and_move.instrument import Instrumentation, InstrumentedClient
+from mood_and_move.levels import calc_level, level_points, progress_fraction
+from mood_and_move.metrics import AppMetrics, start_exporters
+from mood_and_move.perf import RerunTimer, cache_deltas, state_size
+from mood_and_move.profiling import RerunProfiler
+from mood_and_move.recommend import recommend
+from mood_and_move.repository import LogRepository
+from mood_and_move.storage import Storage, make_storage
+from mood_and_move.writebehind import WriteBehindQueue
+
+if TYPE_CHECKING:  # heavy modules load lazily where they are used; see benchmarks/bench_importtime.py
+    from supabase import Client
 
 # ---------- App config ----------
+timer = RerunTimer()
+timer.begin("setup")
+rendered_step = None  # set once the step body starts; labels the step render time metric
+caches_at_start = cache_stats()
 st.set_page_config(page_title="Mood & Move", page_icon="✨", layout="centered")
 
+def secret(name: str, default=None):
+    try:
+        return st.secrets[name]
+    except Exception:
+        return default
+
+# Admin-only profiling of one whole rerun: ?profile=<ADMIN_TOKEN>, finished by finish_profile()
+stale_profiler = st.session_state.pop("rerun_profiler", None)
+if stale_profiler is not None:
+    stale_profiler.stop()  # that run was interrupted (widget event or error); drop it and capture this one
+if secret("ADMIN_TOKEN") and st.query_params.get("profile") == str(secret("ADMIN_TOKEN")):
+    st.session_state["rerun_profiler"] = RerunProfiler().start()
+
 # ---------- Data ----------
 ROOT = Path(__file__).resolve().parent
 DATA_FILE = ROOT / "data.json"
-EMOTIONS = ["행복", "불안", "분노", "무기력", "슬픔", "집중"]
-LEVEL_THRESHOLDS = [0, 3, 7, 15, 30, 60]
+GLOBAL_CACHE_TTL = 60  # seconds; global dashboard aggregates are shared by all sessions
+DEFAULT_MAX_CONCURRENCY = 4  # prefetch queries in flight per rerun
+DEFAULT_HTTP_CONNECTIONS = 20  # HttpConfig.max_connections default; sizes the shared query pool
+USER_CACHE_TTL = 600  # seconds
+USER_CACHE_SIZE = 10_000
+WRITE_BEHIND_INTERVAL = 0.5  # seconds between background flushes of logs updates
+WRITE_BEHIND_GIVE_UP = 600  # seconds a failing logs update keeps being retried before it is dropped
+SLOW_QUERY_MS = 500  # backend calls slower than this are logged
+METRICS_FILE_INTERVAL = 15  # seconds between METRICS_FILE rewrites
+PROFILE_TOP_N = 25
+DEFAULT_PROFILE_DIR = ROOT / "profiles"
+DEFAULT_SQLITE_PATH = ROOT / "mood_and_move.sqlite3"
 
-@st.cache_data
-def load_data():
-    return json.loads(DATA_FILE.read_text(encoding="utf-8"))
+@st.cache_resource
+def load_data() -> Catalog:
+    # cache_resource: the compiled catalog is immutable, so share it instead of
+    # letting cache_data copy the whole JSON on every rerun.
+    return load_catalog(DATA_FILE)
 
 data = load_data()
-emotions = [e for e in EMOTIONS if e in data] or list(data.keys())
+emotions = data.ordered_emotions()
+
+# ---------- Storage ----------
+def get_supabase() -> "Client":
+    from mood_and_move.client import HttpConfig, create_supabase_client
 
-# ---------- Supabase ----------
-def get_supabase() -> Client:
     try:
         url = st.secrets["SUPABASE_URL"]
         key = st.secrets["SUPABASE_ANON_KEY"]
     except Exception:
         st.error("🚨 Streamlit secrets에 SUPABASE_URL / SUPABASE_ANON_KEY를 설정하세요.")
         st.stop()
-    return create_client(url, key)
+    # optional [supabase_http] secrets section: pool limits, timeouts, retries (see HttpConfig)
+    return create_supabase_client(url, key, HttpConfig.from_mapping(secret("supabase_http", {})))
+
+def http_pool_stats() -> list:
+    """`client.pool_stats()`, imported on first use (metrics scrape or perf panel)."""
+    from mood_and_move.client import pool_stats
+
+    return pool_stats()
+
+@st.cache_resource
+def app_metrics() -> AppMetrics:
+    """Process-wide metrics, exported per the METRICS_PORT / METRICS_FILE secrets."""
+    supabase = secret("STORAGE_BACKEND", "supabase") == "supabase"
+    metrics = AppMetrics(cache_stats=cache_stats, pool_stats=http_pool_stats if supabase else None)
+    start_exporters(metrics.registry, port=secret("METRICS_PORT"), path=secret("METRICS_FILE"),
+                    interval=float(secret("METRICS_FILE_INTERVAL", METRICS_FILE_INTERVAL)))
+    return metrics
+
+@st.cache_resource
+def instrumentation() -> Instrumentation:
+    return Instrumentation(slow_ms=float(secret("SLOW_QUERY_MS", SLOW_QUERY_MS)),
+                           on_record=(app_metrics().observe_query,))
 
 @st.cache_resource
 def supabase_client():
-    return get_supabase()
-
-sb = supabase_client()
-
-def upsert_user(sb: Client, username: str):
-    res = sb.table("users").select("*").eq("username", username).execute()
-    if res.data:
-        return res.data[0]
-    res = sb.table("users").insert({"username": username}).execute()
-    return res.data[0]
-
-def fetch_user_logs(sb: Client, user_id: str, days: int = 120) -> pd.DataFrame:
-    since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
-    res = sb.table("logs").select("*").eq("user_id", user_id).gte("log_date", since).order("log_date").execute()
-    return pd.DataFrame(res.data or [])
-
-def get_today_row(sb: Client, user_id: str, day: str):
-    res = sb.table("logs").select("*").eq("user_id", user_id).eq("log_date", day).limit(1).execute()
-    return res.data[0] if res.data else None
-
-def insert_today_row(sb: Client, user_id: str, day: str, payload: dict):
-    payload = {"user_id": user_id, "log_date": day, **payload}
-    res = sb.table("logs").insert(payload).execute()
-    return res.data[0]
-
-def update_row(sb: Client, row_id: int, payload: dict):
-    sb.table("logs").update(payload).eq("id", row_id).execute()
-
-# ---------- Questions (10 × 4 options) ----------
-QUESTIONS = [
-    {"id": "q1","text": "오늘 가장 듣고 싶은 음악은?",
-     "options":[
-        {"key":"kpop_dance","label":"신나는 K-POP 댄스곡","weights":{"행복":1.0,"집중":0.2}},
-        {"key":"ballad","label":"센치한 발라드","weights":{"슬픔":1.0,"행복":-0.2}},
-        {"key":"rock","label":"에너지 넘치는 락/브릿팝","weights":{"분노":1.0,"행복":0.2}},
-        {"key":"lofi","label":"차분한 로파이 재즈","weights":{"집중":1.0,"불안":-0.2}}
-     ]},
-    {"id": "q2","text": "오늘 가장 보고 싶은 영화는?",
-     "options":[
-        {"key":"romcom","label":"달달한 로맨틱 코미디","weights":{"행복":1.0,"집중":0.2}},
-        {"key":"drama","label":"감정선을 건드리는 드라마","weights":{"슬픔":1.0,"행복":-0.2}},
-        {"key":"action","label":"몰입감 강한 액션 스릴러","weights":{"집중":0.8,"분노":0.6}},
-        {"key":"docu","label":"차분한 다큐멘터리","weights":{"집중":1.0,"불안":-0.2}}
-     ]},
-    {"id": "q3","text": "오늘 읽고 싶은 책은?",
-     "options":[
-        {"key":"selfhelp","label":"동기부여 되는 자기계발서","weights":{"집중":1.0,"행복":0.4}},
-        {"key":"novel","label":"감정에 몰입되는 장편 소설","weights":{"슬픔":0.8,"행복":-0.2}},
-        {"key":"essay","label":"차분한 감성 에세이","weights":{"불안":0.5,"슬픔":0.6}},
-        {"key":"comic","label":"가볍게 웃을 수 있는 만화","weights":{"행복":1.0,"무기력":-0.3}}
-     ]},
-    {"id": "q4","text": "오늘 여행을 간다면 어디로 가고 싶나요?",
-     "options":[
-        {"key":"beach","label":"햇살 가득한 해변","weights":{"행복":1.0,"집중":0.2}},
-        {"key":"mountain","label":"조용한 산속 트레킹","weights":{"불안":0.8,"집중":0.5}},
-        {"key":"city","label":"활기찬 도심 탐험","weights":{"행복":0.6,"분노":0.4}},
-        {"key":"home","label":"집에서 여유롭게 쉬기","weights":{"무기력":1.0,"슬픔":0.4}}
-     ]},
-    {"id": "q5","text": "오늘 가장 만나고 싶은 친구는?",
-     "options":[
-        {"key":"cheerful","label":"항상 웃고 떠드는 친구","weights":{"행복":1.0,"집중":0.2}},
-        {"key":"listener","label":"내 얘기를 잘 들어주는 친구","weights":{"슬픔":0.8,"행복":0.3}},
-        {"key":"motivator","label":"도전심을 북돋아주는 친구","weights":{"집중":0.8,"행복":0.2}},
-        {"key":"quiet","label":"그냥 옆에만 있어도 편한 친구","weights":{"불안":0.7,"무기력":0.5}}
-     ]},
-    {"id": "q6","text": "오늘 걷고 싶은 동네는?",
-     "options":[
-        {"key":"park","label":"잔디와 벤치가 있는 공원","weights":{"행복":0.8,"불안":0.3}},
-        {"key":"river","label":"물소리 들리는 강변 산책로","weights":{"슬픔":0.7,"집중":0.4}},
-        {"key":"alley","label":"작은 카페가 있는 골목길","weights":{"집중":0.8,"행복":0.4}},
-        {"key":"home","label":"집 주변 단순 산책","weights":{"무기력":1.0,"불안":0.4}}
-     ]},
-    {"id": "q7","text": "지금 타고 싶은 대중교통은?",
-     "options":[
-        {"key":"bus","label":"창밖을 보며 여유 있게 가는 버스","weights":{"불안":0.5,"슬픔":0.5}},
-        {"key":"subway","label":"빠르고 효율적인 지하철","weights":{"집중":1.0,"행복":0.3}},
-        {"key":"bike","label":"시원한 바람을 가르는 자전거","weights":{"행복":0.8,"분노":0.4}},
-        {"key":"walk","label":"느긋하게 걷기","weights":{"무기력":0.6,"슬픔":0.4}}
-     ]},
-    {"id": "q8","text": "오늘 먹고 싶은 음식은?",
-     "options":[
-        {"key":"spicy","label":"매운 음식으로 스트레스 해소","weights":{"분노":1.0,"행복":0.2}},
-        {"key":"sweet","label":"달달한 디저트로 기분전환","weights":{"행복":1.0,"무기력":-0.3}},
-        {"key":"healthy","label":"건강한 샐러드/웰빙식","weights":{"집중":0.8,"불안":0.3}},
-        {"key":"comfort","label":"집밥 같은 편안한 음식","weights":{"무기력":0.8,"슬픔":0.4}}
-     ]},
-    {"id": "q9","text": "지금 당장 하고 싶은 활동은?",
-     "options":[
-        {"key":"exercise","label":"땀나는 운동으로 리프레시","weights":{"행복":0.9,"집중":0.6}},
-        {"key":"sleep","label":"아무것도 안 하고 잠자기","weights":{"무기력":1.0,"슬픔":0.4}},
-        {"key":"study","label":"집중해서 공부/업무하기","weights":{"집중":1.0,"불안":0.4}},
-        {"key":"chat","label":"친구와 수다 떨기","weights":{"행복":1.0,"분노":-0.2}}
-     ]},
-    {"id": "q10","text": "지금 가장 필요한 건?",
-     "options":[
-        {"key":"hug","label":"누군가의 포근한 포옹","weights":{"슬픔":0.9,"행복":0.5}},
-        {"key":"focus","label":"조용하고 집중할 수 있는 공간","weights":{"집중":1.0,"불안":0.4}},
-        {"key":"fun","label":"유쾌한 웃음과 에너지","weights":{"행복":1.0,"집중":0.3}},
-        {"key":"break","label":"아무도 건드리지 않는 혼자만의 휴식","weights":{"무기력":1.0,"불안":0.5}}
-     ]}
-]
-
-def infer_emotion_from_choice(choice):
-    scores = {e: 0.0 for e in emotions}
-    for emo, w in choice["weights"].items():
-        if emo in scores:
-            scores[emo] += w
-    max_val = max(scores.values()) if scores else 0
-    cands = [e for e, v in scores.items() if abs(v - max_val) < 1e-9]
-    return random.choice(cands) if cands else emotions[0], scores
-
-# ---------- History / cooldown helpers ----------
-def build_history_from_df(df: pd.DataFrame):
-    hist = {}
-    if df.empty:
-        return hist
-    for col in ["quote_id", "challenge_id"]:
-        sub = df.dropna(subset=[col, "log_date"])
-        for _, r in sub.iterrows():
-            item_id = r[col]
-            try:
-                dt = datetime.datetime.fromisoformat(str(r["log_date"]))
-            except Exception:
-                dt = datetime.datetime.strptime(str(r["log_date"]), "%Y-%m-%d")
-            latest = hist.get(item_id)
-            if (latest is None) or (dt > latest):
-                hist[item_id] = dt
-    return hist
-
-def eligible(items, history, today):
-    ok = []
-    for it in items:
-        iid = it["id"]
-        cooldown = int(it.get("cooldown_days", 0))
-        last = history.get(iid)
-        if (last is None) or ((today - last).days >= cooldown):
-            ok.append(it)
-    ok.sort(key=lambda x: x.get("difficulty", 1))
-    return ok
-
-def pick_item(items, history, today):
-    pool = eligible(items, history, today)
-    if not pool:
-        items_sorted = sorted(items, key=lambda x: history.get(x["id"], datetime.datetime(1970,1,1)))
-        return items_sorted[0]
-    first_diff = pool[0].get("difficulty", 1)
-    tier = [x for x in pool if x.get("difficulty", 1) == first_diff]
-    return random.choice(tier)
-
-# ---------- Level helpers ----------
-def calc_level(points: int) -> int:
-    lvl = 0
-    for i, th in enumerate(LEVEL_THRESHOLDS):
-        if points >= th:
-            lvl = i
-    return max(1, lvl)
-
-def progress_fraction(points: int) -> float:
-    curr_idx = 0
-    for i, th in enumerate(LEVEL_THRESHOLDS):
-        if points >= th:
-            curr_idx = i
-    curr_th = LEVEL_THRESHOLDS[curr_idx]
-    if curr_idx == len(LEVEL_THRESHOLDS) - 1:
-        return 1.0
-    next_th = LEVEL_THRESHOLDS[curr_idx + 1]
-    span = max(1, next_th - curr_th)
-    return max(0.0, min(1.0, (points - curr_th) / span))
+    return InstrumentedClient(get_supabase(), instrumentation())
+
+@st.cache_resource
+def storage() -> Storage:
+    backend = secret("STORAGE_BACKEND", "supabase")
+    if backend == "sqlite":
+        return make_storage("sqlite", path=secret("SQLITE_PATH", str(DEFAULT_SQLITE_PATH)),
+                            page_size=secret("LOG_PAGE_SIZE"))
+    return make_storage("supabase", client=supabase_client(), page_size=secret("LOG_PAGE_SIZE"))
+
+@st.cache_resource
+def query_executor() -> QueryExecutor:
+    # pool as large as the HTTP pool; the per-rerun limit keeps one session from hogging it
+    http = dict(secret("supabase_http", {}) or {})
+    return QueryExecutor(max_workers=int(http.get("max_connections", DEFAULT_HTTP_CONNECTIONS)),
+                         per_call=int(secret("SUPABASE_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+store = storage()
+# backend calls of this rerun (Supabase backend); the previous rerun's totals are folded in and logged
+st.session_state["rerun_queries"] = instrumentation().start_rerun(st.session_state.get("rerun_queries"))
+app_metrics().sessions.touch(st.session_state.setdefault("session_id", uuid.uuid4().hex))
+
+@st.cache_resource
+def global_aggregate_cache() -> TTLCache:
+    return TTLCache("global_distribution", ttl=GLOBAL_CACHE_TTL, maxsize=16)
+
+def global_distribution(store: Storage, days: int, cache: TTLCache = None) -> list:
+    """`Storage.emotion_distribution` shared across sessions, keyed by period and date.
+
+    Pass `cache` when calling off the script thread, where `st.cache_resource`
+    cannot be resolved.
+    """
+    cache = cache or global_aggregate_cache()
+    key = (days, datetime.date.today().isoformat())
+    return cache.get_or_compute(key, lambda: store.emotion_distribution(days))
+
+def invalidate_global_aggregates():
+    global_aggregate_cache().invalidate()
+
+@st.cache_resource
+def write_queue():
+    """Process-wide write-behind queue for logs updates; None when disabled."""
+    if not secret("WRITE_BEHIND", True):
+        return None
+    queue = WriteBehindQueue(
+        storage(),
+        flush_interval=float(secret("WRITE_BEHIND_INTERVAL", WRITE_BEHIND_INTERVAL)),
+        give_up_after=float(secret("WRITE_BEHIND_GIVE_UP", WRITE_BEHIND_GIVE_UP)),
+        on_flush=(global_aggregate_cache().invalidate,),
+    )
+    app_metrics().track_write_queue(queue.stats)
+    return queue
+
+@st.cache_resource
+def user_cache() -> TTLCache:
+    return TTLCache("users", ttl=USER_CACHE_TTL, maxsize=USER_CACHE_SIZE)
+
+def login(store: Storage, username: str) -> dict:
+    """User row for `username`, shared across sessions so reconnects skip the backend."""
+    return user_cache().get_or_compute(username, lambda: store.upsert_user(username))
+
+# ---------- Perf panel (opt-in) ----------
+def perf_panel_enabled() -> bool:
+    """PERF_PANEL secret, or `?perf=1` — `?perf=<PERF_TOKEN>` once that secret is set."""
+    if secret("PERF_PANEL", False):
+        return True
+    param = st.query_params.get("perf")
+    if not param:
+        return False
+    token = secret("PERF_TOKEN")
+    return param == str(token) if token else param not in ("0", "false")
+
+def section_lines(sections: dict) -> str:
+    return "\n".join(f"{name:<16}{sec * 1000:8.1f} ms" for name, sec in sections.items())
+
+def render_perf_panel(total: float):
+    if not perf_panel_enabled():
+        return
+    with st.sidebar.expander("⏱ perf", expanded=True):
+        redirected = st.session_state.pop("perf_redirected", None)
+        if redirected:
+            st.markdown(f"**previous run** (ended in st.rerun) {redirected['total'] * 1000:.1f} ms · "
+                        f"{redirected['calls']} calls · {redirected['ms']} ms backend")
+            st.text(section_lines(redirected["sections"]))
+        st.markdown(f"**script** {total * 1000:.1f} ms")
+        st.text(section_lines(timer.sections))
+
+        queries = st.session_state.get("rerun_queries")
+        if secret("STORAGE_BACKEND", "supabase") == "supabase" and queries is not None:
+            q = queries.summary()
+            st.markdown(f"**backend** {q['calls']} calls · {q['ms']} ms · {q['rows']} rows")
+            st.text("\n".join(f"{r.op:<28}{r.caller:<22}{r.seconds * 1000:7.1f} ms {r.rows:>5} rows"
+                              for r in list(queries.records)) or "-")
+            for pool in http_pool_stats():
+                st.caption(f"http pool {pool['in_flight']}/{pool['max_connections']} in flight · "
+                           f"peak {pool['peak_in_flight']} · {pool['saturated_requests']} waited · "
+                           f"{pool['pool_timeouts']} pool timeouts · {pool['retries']} retries")
+            slow = instrumentation().slow
+            if slow:
+                st.caption(f"{len(slow)} slow queries ≥ {instrumentation().slow_ms:.0f} ms since start")
+        else:
+            st.markdown("**backend** SQLite (not instrumented)")
+
+        st.markdown("**caches** (this rerun, process-wide)")
+        st.text("\n".join(f"{name:<22}{d['hits']:>4} hit {d['misses']:>4} miss"
+                          for name, d in cache_deltas(caches_at_start, cache_stats()).items()) or "-")
+
+        sizes = state_size(st.session_state.to_dict())
+        st.markdown(f"**session_state** {len(sizes)} keys · {sum(n for _, n in sizes) / 1024:.1f} KiB")
+        st.text("\n".join(f"{key:<22}{n:>8} B" for key, n in sizes[:8]))
+
+def finish_profile():
+    """Stop an admin profile capture and write it to PROFILE_DIR; `render_profile` shows it."""
+    profiler = st.session_state.pop("rerun_profiler", None)
+    if profiler is None:
+        return
+    profiler.stop()
+    who = re.sub(r"[^\w-]", "_", st.session_state.get("username") or "anon")
+    name = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{who}-{st.session_state.get('step', 'login')}"
+    prof, scope = profiler.write(secret("PROFILE_DIR", str(DEFAULT_PROFILE_DIR)), name)
+    del st.query_params["profile"]  # one rerun per request
+    st.session_state["profile_result"] = (profiler.elapsed, prof, scope,
+                                          profiler.top(int(secret("PROFILE_TOP_N", PROFILE_TOP_N))))
+
+def render_profile():
+    """Hottest functions of the last capture, kept in session state across an st.rerun()."""
+    result = st.session_state.pop("profile_result", None)
+    if result is None:
+        return
+    elapsed, prof, scope, top = result
+    with st.expander(f"🔥 profile · {elapsed * 1000:.0f} ms", expanded=True):
+        st.caption(f"{prof}  ·  {scope} (speedscope.app)")
+        st.text("\n".join(
+            [f"{'cumtime':>9} {'tottime':>9} {'calls':>7}  function"]
+            + [f"{r['cumtime'] * 1000:7.1f}ms {r['tottime'] * 1000:7.1f}ms {r['calls']:>7}  {r['function']}" for r in top]
+        ))
+        col1, col2 = st.columns(2)
+        col1.download_button("⬇️ .prof", data=prof.read_bytes(), file_name=prof.name, key="btn_profile_prof")
+        col2.download_button("⬇️ speedscope", data=scope.read_bytes(), file_name=scope.name,
+                             mime="application/json", key="btn_profile_speedscope")
+
+def end_rerun(redirecting: bool = False):
+    """Close the rerun: finish a profile capture, record its time, show the perf panel.
+
+    A rerun ending in `st.rerun()` (`redirecting`) would never show what it
+    renders, so the profile and perf summary wait in session state for the next one.
+    """
+    finish_profile()
+    total = timer.finish()
+    if rendered_step:
+        app_metrics().step_seconds.observe(total, step=rendered_step)
+    if redirecting:
+        queries = st.session_state.get("rerun_queries")
+        if perf_panel_enabled() and queries is not None:
+            q = queries.summary()
+            st.session_state["perf_redirected"] = {"total": total, "sections": dict(timer.sections),
+                                                   "calls": q["calls"], "ms": q["ms"]}
+        return
+    render_profile()
+    render_perf_panel(total)
+
+def stop():
+    """`st.stop()` that still closes the rerun (see `end_rerun`)."""
+    end_rerun()
+    st.stop()
+
+def rerun():
+    """`st.rerun()` that still closes the rerun (see `end_rerun`)."""
+    end_rerun(redirecting=True)
+    st.rerun()
 
 # ---------- Sidebar: login ----------
 st.sidebar.subheader("로그인")
 username = st.sidebar.text_input("닉네임(간단히):", value=st.session_state.get("username", ""))
 if st.sidebar.button("확인") or (username and "user" not in st.session_state):
-    user = upsert_user(sb, username.strip())
+    user = login(store, username.strip())
     st.session_state["username"] = username.strip()
     st.session_state["user"] = user
 
 if "user" not in st.session_state:
     st.info("왼쪽 사이드바에서 닉네임을 입력해 로그인해 주세요.")
-    st.stop()
+    stop()
 
 user = st.session_state["user"]
 user_id = user["id"]
@@ -248,6 +330,7 @@ def render_step_header():
             cols[i].markdown(f"{label}")
 
 # ---------- Header ----------
+timer.begin("header")
 st.title("Mood & Move")
 st.caption("하루 한 문항으로 감정을 추정하고, 맞춤 한 문장과 작은 행동을 추천합니다.")
 
@@ -259,37 +342,42 @@ period_label = st.sidebar.radio("기간 선택", list(PERIOD_OPTIONS.keys()), in
 DASHBOARD_DAYS = PERIOD_OPTIONS[period_label]
 
 # ---------- Common state ----------
+timer.begin("prefetch")
 today_str = datetime.date.today().isoformat()
-df_user_full = fetch_user_logs(sb, user_id, days=120)
-history = build_history_from_df(df_user_full)
+logs = LogRepository(store, user_id, on_write=(invalidate_global_aggregates,), writes=write_queue())
+
+# The queries this rerun needs are independent: issue them together.
+prefetch = {
+    "window": logs.rows,
+    "points": lambda: store.emotion_points(user_id),
+}
+if st.session_state.get("step") == "dashboard":
+    agg_cache = global_aggregate_cache()
+    prefetch["global"] = lambda: global_distribution(store, DASHBOARD_DAYS, cache=agg_cache)
+prefetched = logs.read_consistent(lambda: query_executor().gather(**prefetch))
+
+def lock_todays_question():
+    """Draw today's question and option order once per day per session."""
+    if st.session_state.get("quiz_date") != today_str:
+        qid, order = draw_question()
+        st.session_state.update(quiz_date=today_str, quiz_qid=qid, quiz_order=order, quiz_choice_index=None)
 
 def get_or_create_today_row():
-    row = get_today_row(sb, user_id, today_str)
+    row = logs.today_row(today_str)
     if row:
         return row
     # lock today's question in session
-    if ("quiz_date" not in st.session_state) or (st.session_state["quiz_date"] != today_str):
-        st.session_state["quiz_date"] = today_str
-        q = random.choice(QUESTIONS)
-        order = list(range(len(q["options"])))
-        random.shuffle(order)
-        st.session_state["quiz_qid"] = q["id"]
-        st.session_state["quiz_order"] = order
-        st.session_state["quiz_choice_index"] = None
+    lock_todays_question()
     qid = st.session_state["quiz_qid"]
-    q = next(x for x in QUESTIONS if x["id"] == qid)
-    order = st.session_state["quiz_order"]
-    options = [q["options"][i] for i in order]
+    q = get_question(qid)
+    options = ordered_options(q, st.session_state["quiz_order"])
     if st.session_state.get("quiz_choice_index") is None:
         return None
     choice = options[st.session_state["quiz_choice_index"]]
-    emo, _ = infer_emotion_from_choice(choice)
-    now = datetime.datetime.now()
-    emo_data = data[emo]
-    quote_item = pick_item(emo_data["quotes"], history, now)
-    chall_item = pick_item(emo_data["challenges"], history, now)
-    row = insert_today_row(
-        sb, user_id, today_str,
+    emo, _ = infer_emotion_from_choice(choice, emotions)
+    quote_item, chall_item = recommend(data[emo], logs.history(), datetime.datetime.now())
+    row, created = logs.submit_today_row(
+        today_str,
         {
             "emotion": emo,
             "choice_key": choice["key"],
@@ -300,30 +388,35 @@ def get_or_create_today_row():
             "points_delta": 0
         }
     )
+    if created:  # not a second tab's replay, which gets the existing row back
+        app_metrics().quiz_submissions.inc(emotion=row["emotion"])
     return row
 
 # init step
 if "step" not in st.session_state:
-    st.session_state["step"] = "result" if get_today_row(sb, user_id, today_str) else "quiz"
+    st.session_state["step"] = "result" if logs.today_row(today_str) else "quiz"
+
+rendered_step = st.session_state["step"]
+timer.begin(f"step:{rendered_step}")
 
 # ---------- STEP 1: QUIZ ----------
 if st.session_state["step"] == "quiz":
     render_step_header()
 
     # 이미 오늘 응답이 존재하면: 저장된 질문을 읽기 전용으로 보여주기
-    today_row_existing = get_today_row(sb, user_id, today_str)
+    today_row_existing = logs.today_row(today_str)
     if today_row_existing:
         st.header("① 오늘의 한 문항 (이미 제출됨)")
         qid_saved = today_row_existing.get("question_id")
         choice_saved = today_row_existing.get("choice_key")
 
-        q = next((x for x in QUESTIONS if x["id"] == qid_saved), None) if qid_saved else None
+        q = get_question(qid_saved) if qid_saved else None
         if not q:
             st.info("오늘 문항은 이미 제출되었습니다.")
             st.button("결과로 →", type="primary",
                       on_click=lambda: st.session_state.update({"step": "result"}),
                       key="btn_go_result_readonly")
-            st.stop()
+            stop()
 
         st.write(f"**{q['text']}**")
         labels = [opt["label"] for opt in q["options"]]
@@ -339,26 +432,18 @@ if st.session_state["step"] == "quiz":
             st.button("대시보드로 →",
                       on_click=lambda: st.session_state.update({"step": "dashboard"}),
                       key="btn_go_dashboard_from_readonly")
-        st.stop()
+        stop()
 
     # (아직 응답 전) 오늘 질문 고정/복원
-    if ("quiz_date" not in st.session_state) or (st.session_state["quiz_date"] != today_str):
-        st.session_state["quiz_date"] = today_str
-        q = random.choice(QUESTIONS)
-        order = list(range(len(q["options"])))
-        random.shuffle(order)
-        st.session_state["quiz_qid"] = q["id"]
-        st.session_state["quiz_order"] = order
-        st.session_state["quiz_choice_index"] = None
+    lock_todays_question()
 
     qid = st.session_state["quiz_qid"]
-    q = next(x for x in QUESTIONS if x["id"] == qid)
-    order = st.session_state["quiz_order"]
+    q = get_question(qid)
 
     st.header("① 오늘의 한 문항")
     st.write(f"**{q['text']}**")
 
-    options = [q["options"][i] for i in order]
+    options = ordered_options(q, st.session_state["quiz_order"])
     labels = [opt["label"] for opt in options]
     sel = st.radio(
         "하나를 선택하세요",
@@ -376,17 +461,17 @@ if st.session_state["step"] == "quiz":
             row = get_or_create_today_row()
             if row:
                 st.session_state["step"] = "result"
-                st.rerun()
+                rerun()
     with col2:
         st.button("초기화", on_click=lambda: st.session_state.update({"quiz_choice_index": None}), key="btn_reset_quiz")
 
 # ---------- STEP 2: RESULT + RECOMMEND ----------
 elif st.session_state["step"] == "result":
     render_step_header()
-    today_row = get_today_row(sb, user_id, today_str)
+    today_row = logs.today_row(today_str)
     if not today_row:
         st.session_state["step"] = "quiz"
-        st.rerun()
+        rerun()
 
     emo = today_row["emotion"]
     st.header("② 오늘의 결과")
@@ -397,13 +482,11 @@ elif st.session_state["step"] == "result":
     emo_data = data[emo]
     quote_id = today_row.get("quote_id")
     chall_id = today_row.get("challenge_id")
-    quote_item = next((x for x in emo_data["quotes"] if x["id"] == quote_id), None)
-    chall_item = next((x for x in emo_data["challenges"] if x["id"] == chall_id), None)
-    now = datetime.datetime.now()
+    quote_item = emo_data.quotes.get(quote_id)
+    chall_item = emo_data.challenges.get(chall_id)
     if not quote_item or not chall_item:
-        quote_item = pick_item(emo_data["quotes"], history, now)
-        chall_item = pick_item(emo_data["challenges"], history, now)
-        update_row(sb, today_row["id"], {"quote_id": quote_item["id"], "challenge_id": chall_item["id"]})
+        quote_item, chall_item = recommend(emo_data, logs.history(), datetime.datetime.now())
+        logs.update_row(today_row["id"], {"quote_id": quote_item["id"], "challenge_id": chall_item["id"]})
 
     st.subheader(f"오늘의 추천 · {emo}")
     st.write(f"**한 문장**: {quote_item['text']}")
@@ -420,11 +503,12 @@ elif st.session_state["step"] == "result":
             payload = {"completed": bool(done)}
             if done and not already_saved:
                 payload["points_delta"] = 1
-            update_row(sb, today_row["id"], payload)
+            logs.update_row(today_row["id"], payload)
+            app_metrics().saves.inc(points_delta=payload.get("points_delta", 0))
             st.success("저장되었습니다.")
             st.balloons()
             st.session_state["step"] = "dashboard"
-            st.rerun()
+            rerun()
     with col2:
         st.button("← 문항 다시 보기", on_click=lambda: st.session_state.update({"step": "quiz"}), key="btn_back_quiz")
     with col3:
@@ -432,12 +516,15 @@ elif st.session_state["step"] == "result":
 
 # ---------- STEP 3: DASHBOARD ----------
 elif st.session_state["step"] == "dashboard":
+    import altair as alt
+    import pandas as pd
+
     render_step_header()
     st.header("③ 대시보드")
 
     # 개인
     st.subheader(f"내 {DASHBOARD_DAYS}일 대시보드")
-    dfp = fetch_user_logs(sb, user_id, days=DASHBOARD_DAYS)
+    dfp = logs.frame(days=DASHBOARD_DAYS)
     if dfp.empty:
         st.info("아직 기록이 없어요.")
     else:
@@ -458,18 +545,31 @@ elif st.session_state["step"] == "dashboard":
     st.markdown("---")
     # 전체
     st.subheader(f"전체 {DASHBOARD_DAYS}일 감정 분포(익명 합산)")
-    since = (datetime.date.today() - datetime.timedelta(days=DASHBOARD_DAYS)).isoformat()
-    res = sb.table("logs").select("emotion, completed").gte("log_date", since).execute()
-    all_df = pd.DataFrame(res.data or [])
-    if all_df.empty:
+    dist = prefetched["global"] if "global" in prefetched else global_distribution(store, DASHBOARD_DAYS)
+    all_df = pd.DataFrame(dist)
+    if all_df.empty or all_df["n"].sum() == 0:
         st.info("아직 전체 기록이 적습니다.")
     else:
-        emo_counts = all_df.groupby("emotion")["emotion"].count().reset_index(name="count")
+        emo_counts = all_df.rename(columns={"n": "count"})[["emotion", "count"]]
         chart = alt.Chart(emo_counts).mark_bar().encode(
             x="emotion:N", y="count:Q", tooltip=["emotion", "count"]
         )
         st.altair_chart(chart, use_container_width=True)
-        st.metric(f"전체 평균 완료율({DASHBOARD_DAYS}일)", f"{(all_df['completed'].mean()*100):.0f}%")
+        rate = all_df["n_completed"].sum() / all_df["n"].sum()
+        st.metric(f"전체 평균 완료율({DASHBOARD_DAYS}일)", f"{(rate*100):.0f}%")
+
+    st.markdown("---")
+    # 내보내기: keyset pages streamed straight into the file, no DataFrame
+    st.subheader("내 전체 기록 내보내기")
+    export_fmt = st.radio("형식", EXPORT_FORMATS, horizontal=True, key="export_fmt")
+    if st.button("파일 만들기", key="btn_export"):
+        # queued updates are read through the overlay, not flushed; the file is
+        # only offered in this rerun, never kept in session state
+        buf = io.BytesIO()
+        export_user(store, user_id, export_fmt, buf, pending=logs.writes.pending if logs.writes else None)
+        st.download_button("⬇️ 다운로드", data=buf,
+                           file_name=f"mood_and_move_{user['username']}.{export_fmt}",
+                           mime=MIME_TYPES[export_fmt], key="btn_export_download")
 
     st.markdown("---")
     col1, col2 = st.columns(2)
@@ -478,11 +578,13 @@ elif st.session_state["step"] == "dashboard":
     with col2:
         st.button("오늘 문항 다시 보기", on_click=lambda: st.session_state.update({"step": "quiz"}), key="btn_go_quiz")
 
-# ---------- Sidebar: Emotion Levels (last 120 days) ----------
-df_user_levels = fetch_user_logs(sb, user_id, days=120)
-points_by_emo = (df_user_levels.groupby("emotion")["points_delta"].sum() if not df_user_levels.empty else pd.Series(dtype=int))
+# ---------- Sidebar: Emotion Levels ----------
+timer.begin("sidebar levels")
+points_by_emo = level_points(prefetched["points"], logs.points_adjustment())
 st.sidebar.header("감정 레벨")
 for e in emotions:
     pts = int(points_by_emo.get(e, 0))
     st.sidebar.write(f"{e} · Lv.{calc_level(pts)} · {pts} pts")
     st.sidebar.progress(progress_fraction(pts))
+
+end_rerun()
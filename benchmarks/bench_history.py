@@ -0,0 +1,84 @@
+"""Compare the vectorized history builder with the original iterrows loop.
+
+    python benchmarks/bench_history.py                 # 120, 10k and 1M rows
+    python benchmarks/bench_history.py --sizes 120 10000
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mood_and_move.catalog import load_catalog  # noqa: E402
+from mood_and_move.history import build_history_from_df  # noqa: E402
+
+DATA_FILE = Path(__file__).resolve().parents[1] / "data.json"
+
+
+def legacy_build_history(df: pd.DataFrame):
+    """The pre-vectorization implementation, kept here as the baseline."""
+    hist = {}
+    if df.empty:
+        return hist
+    for col in ["quote_id", "challenge_id"]:
+        sub = df.dropna(subset=[col, "log_date"])
+        for _, r in sub.iterrows():
+            item_id = r[col]
+            try:
+                dt = datetime.datetime.fromisoformat(str(r["log_date"]))
+            except Exception:
+                dt = datetime.datetime.strptime(str(r["log_date"]), "%Y-%m-%d")
+            latest = hist.get(item_id)
+            if (latest is None) or (dt > latest):
+                hist[item_id] = dt
+    return hist
+
+
+def make_logs(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    catalog = load_catalog(DATA_FILE)
+    quote_ids = np.array([it["id"] for e in catalog.emotions for it in catalog[e].quotes], dtype=object)
+    chall_ids = np.array([it["id"] for e in catalog.emotions for it in catalog[e].challenges], dtype=object)
+    today = datetime.date.today()
+    days = rng.integers(0, max(120, n // 50), size=n)
+    log_date = [(today - datetime.timedelta(days=int(d))).isoformat() for d in days]
+    quote = quote_ids[rng.integers(0, len(quote_ids), size=n)]
+    chall = chall_ids[rng.integers(0, len(chall_ids), size=n)]
+    quote[rng.random(n) < 0.05] = None
+    chall[rng.random(n) < 0.05] = None
+    return pd.DataFrame({"log_date": log_date, "quote_id": quote, "challenge_id": chall})
+
+
+def best_of(fn, df, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(df)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[120, 10_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_logs(n)
+        if legacy_build_history(df) != build_history_from_df(df):
+            sys.exit(f"mismatch at {n} rows")
+        repeat = 1 if n >= 100_000 else 5
+        legacy = best_of(legacy_build_history, df, repeat)
+        vectorized = best_of(build_history_from_df, df, repeat)
+        print(f"{n:>10} {legacy:>12.4f} {vectorized:>15.4f} {legacy / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
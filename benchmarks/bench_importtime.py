@@ -0,0 +1,110 @@
+"""Cold-start import report for app.py, based on `python -X importtime`.
+
+Each step runs in a fresh interpreter under `-X importtime`: the app is
+driven headlessly (AppTest, SQLite backend in a temp dir) up to that step,
+then the importtime log is summarised. Fails if the quiz step pulls in any
+module from --forbid (altair and pandas by default).
+
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --steps quiz --top 25
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "altair", "numpy", "pyarrow", "supabase", "postgrest", "httpx")
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def drive(step: str, db: str):
+    """Child side: render the app up to `step` and print the heavy modules loaded."""
+    sys.path.insert(0, str(ROOT))
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.secrets["STORAGE_BACKEND"] = "sqlite"
+    at.secrets["SQLITE_PATH"] = db
+    at.run()
+    at.sidebar.text_input[0].input("importtime")
+    at.run()
+    if step == "dashboard":
+        radio = at.radio(key="oneq_radio")
+        radio.set_value(radio.options[0])
+        at.run()
+        at.button(key="btn_go_result").click()
+        at.run()
+        at.button(key="btn_go_dashboard").click()
+        at.run()
+    if at.exception:
+        sys.exit(f"app raised: {at.exception}")
+    print(json.dumps({"step": step, "loaded": sorted(m for m in HEAVY if m in sys.modules)}))
+
+
+def parse(stderr: str):
+    """(total self-time us, {top-level package: cumulative us}) from an importtime log."""
+    total, top = 0, {}
+    for line in stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative, indent, name = int(m[1]), int(m[2]), len(m[3]), m[4]
+        total += self_us
+        if indent == 1:  # imported directly, not as a dependency of another import
+            root = name.split(".")[0]
+            top[root] = top.get(root, 0) + cumulative
+    return total, top
+
+
+def run_step(step: str, top_n: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", __file__, "--child", step, "--db", os.path.join(tmp, "t.sqlite3")],
+            capture_output=True, text=True, cwd=ROOT,
+        )
+    if proc.returncode:
+        sys.exit(proc.stderr[-2000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    total, top = parse(proc.stderr)
+    result["import_ms"] = round(total / 1000, 1)
+    result["top"] = [(name, round(us / 1000, 1)) for name, us in sorted(top.items(), key=lambda kv: -kv[1])[:top_n]]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", nargs="+", default=["quiz", "dashboard"], choices=["quiz", "dashboard"])
+    parser.add_argument("--top", type=int, default=15, help="top-level packages to list per step")
+    parser.add_argument("--forbid", nargs="*", default=["altair", "pandas"], help="must not load on the quiz step")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        drive(args.child, args.db)
+        return
+
+    results = [run_step(step, args.top) for step in args.steps]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            print(f"{r['step']}: {r['import_ms']} ms importing, heavy modules loaded: {', '.join(r['loaded']) or '-'}")
+            for name, ms in r["top"]:
+                print(f"  {ms:8.1f} ms  {name}")
+
+    quiz = next((r for r in results if r["step"] == "quiz"), None)
+    leaked = sorted(set(args.forbid) & set(quiz["loaded"])) if quiz else []
+    if leaked:
+        sys.exit(f"FAIL: quiz step imported {', '.join(leaked)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""End-to-end quiz -> result -> dashboard journeys through app.py, headless.
+
+app.py runs under `streamlit.testing.v1.AppTest` against `FakeSupabase`
+(benchmarks/fake_supabase.py) patched in for the real client. Each journey
+logs in a fresh user, picks an answer, clicks "결과 보기 →", completes and
+saves with "기록 저장", then switches the dashboard period to 30일. Every
+rerun reports wall time and the backend calls / bytes it caused; calls made
+by the write-behind worker are reported separately as `background`.
+
+Caches are process-wide, as on a server: the first journey is the cold one.
+Output is JSON, for tracking regressions between releases.
+
+    python benchmarks/bench_journey.py --journeys 10 --history-days 90 -o journey.json
+    python benchmarks/bench_journey.py --latency-ms 20
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fake_supabase import FakeSupabase  # noqa: E402
+from mood_and_move import client as client_module  # noqa: E402
+from mood_and_move.storage import SupabaseStorage  # noqa: E402
+
+BACKGROUND_THREAD = "write-behind"
+
+
+def _pick_answer(at):
+    radio = at.radio(key="oneq_radio")
+    radio.set_value(radio.options[0])
+
+
+def _complete(at):
+    at.checkbox(key="chk_done").check()
+
+
+# (action, interaction before the rerun); every entry is one `AppTest.run()`
+JOURNEY = (
+    ("open", None),
+    ("login", None),  # filled in per journey with the username
+    ("select", _pick_answer),
+    ("submit", lambda at: at.button(key="btn_go_result").click()),
+    ("complete", _complete),
+    ("save", lambda at: at.button(key="btn_save").click()),
+    ("period_30", lambda at: at.sidebar.radio(key="period_radio").set_value("30일")),
+)
+
+
+def summarize_calls(calls) -> dict:
+    fg = [c for c in calls if c.thread != BACKGROUND_THREAD]
+    bg = [c for c in calls if c.thread == BACKGROUND_THREAD]
+    ops = {}
+    for c in fg:
+        ops[c.op] = ops.get(c.op, 0) + 1
+    return {
+        "calls": len(fg),
+        "bytes": sum(c.bytes for c in fg),
+        "rows": sum(c.rows for c in fg),
+        "ops": ops,
+        "background": {"calls": len(bg), "bytes": sum(c.bytes for c in bg)},
+    }
+
+
+def seed_history(fake: FakeSupabase, username: str, days: int):
+    """`days` past answers for `username`, written before the journey starts."""
+    if days <= 0:
+        return
+    store = SupabaseStorage(fake)
+    user_id = store.resolve_users([username])[username]
+    today = datetime.date.today()
+    store.insert_logs(
+        {"user_id": user_id, "log_date": (today - datetime.timedelta(days=d)).isoformat(),
+         "emotion": "집중", "choice_key": "study", "question_id": "q9", "quote_id": None,
+         "challenge_id": None, "completed": d % 2 == 0, "points_delta": int(d % 2 == 0)}
+        for d in range(1, days + 1)
+    )
+
+
+def run_journey(fake: FakeSupabase, username: str, args) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=args.timeout)
+    at.secrets["SUPABASE_URL"] = "http://fake-supabase.invalid"
+    at.secrets["SUPABASE_ANON_KEY"] = "fake"
+    at.secrets["WRITE_BEHIND_INTERVAL"] = args.flush_interval
+    reruns = []
+    started_mark, started = fake.mark(), time.perf_counter()
+    for action, interact in JOURNEY:
+        if action == "login":
+            at.sidebar.text_input[0].input(username)
+        elif interact:
+            interact(at)
+        mark, t0 = fake.mark(), time.perf_counter()
+        at.run()
+        wall = time.perf_counter() - t0
+        if at.exception:
+            sys.exit(f"{action}: app raised {[e.message for e in at.exception]}")
+        reruns.append({"action": action, "wall_ms": round(wall * 1000, 2), **summarize_calls(fake.calls_since(mark))})
+    wall = time.perf_counter() - started
+    time.sleep(args.flush_interval * 3)  # let the write-behind worker drain
+    total = summarize_calls(fake.calls_since(started_mark))
+    return {"user": username, "wall_ms": round(wall * 1000, 2), **total, "reruns": reruns}
+
+
+def _stats(values) -> dict:
+    values = sorted(values)
+    return {
+        "median": round(statistics.median(values), 2),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+        "max": round(values[-1], 2),
+    }
+
+
+def summarize(journeys) -> dict:
+    warm = journeys[1:] or journeys
+    per_action = {}
+    for j in warm:
+        for r in j["reruns"]:
+            per_action.setdefault(r["action"], []).append(r)
+    return {
+        "journey_wall_ms": _stats([j["wall_ms"] for j in warm]),
+        "journey_calls": _stats([j["calls"] + j["background"]["calls"] for j in warm]),
+        "journey_bytes": _stats([j["bytes"] + j["background"]["bytes"] for j in warm]),
+        "cold_journey_wall_ms": journeys[0]["wall_ms"],
+        "reruns": {
+            action: {
+                "wall_ms": _stats([r["wall_ms"] for r in rs]),
+                "calls": _stats([r["calls"] for r in rs]),
+                "bytes": _stats([r["bytes"] for r in rs]),
+            }
+            for action, rs in per_action.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--journeys", type=int, default=5)
+    parser.add_argument("--history-days", type=int, default=60, help="past answers seeded per user")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per backend call")
+    parser.add_argument("--flush-interval", type=float, default=0.05, help="WRITE_BEHIND_INTERVAL secret")
+    parser.add_argument("--timeout", type=float, default=30.0, help="AppTest timeout per rerun")
+    parser.add_argument("-o", "--output", default="-", help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.latency_ms / 1000)
+    client_module.create_supabase_client = lambda url, key, config=None: fake
+
+    journeys = []
+    for n in range(args.journeys):
+        username = f"bench{n}"
+        seed_history(fake, username, args.history_days)
+        journeys.append(run_journey(fake, username, args))
+        print(f"journey {n}: {journeys[-1]['wall_ms']} ms, {journeys[-1]['calls']} calls", file=sys.stderr)
+
+    report = {
+        "benchmark": "journey",
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "summary": summarize(journeys),
+        "journeys": journeys,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
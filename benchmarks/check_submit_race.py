@@ -0,0 +1,90 @@
+"""Hammer `Storage.submit_log` from many threads and check the day stays unique.
+
+Every thread submits today's answer for every user, as if each user had many
+tabs open; afterwards each user must have exactly one row for today, every
+thread must have been handed that same row, and exactly one submission per
+user must have reported creating it.
+
+`--backend supabase` runs the same hammer through `SupabaseStorage` against
+`FakeSupabase` (benchmarks/fake_supabase.py), which enforces the unique
+`(user_id, log_date)` index like PostgREST does; `--latency-ms` widens the
+window between the upsert and the read-back of the winning row.
+
+    python benchmarks/check_submit_race.py --users 20 --threads 32
+    python benchmarks/check_submit_race.py --backend supabase --latency-ms 2
+"""
+
+import argparse
+import datetime
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mood_and_move.storage import SQLiteStorage, SupabaseStorage  # noqa: E402
+
+
+def hammer(store, user_ids, threads: int, day: str) -> dict:
+    """Submit concurrently; returns ({user_id: set of row ids handed back}, {user_id: creations reported})."""
+    seen = defaultdict(set)
+    created = defaultdict(int)
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(n: int):
+        start.wait()
+        for uid in user_ids:
+            row, new = store.submit_log(uid, day, {"emotion": "집중", "choice_key": f"t{n}", "completed": False, "points_delta": 0})
+            with lock:
+                seen[uid].add(row["id"])
+                created[uid] += new
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return seen, created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--backend", choices=("sqlite", "supabase"), default="sqlite")
+    parser.add_argument("--db", default=None, help="SQLite file (default: a temporary one)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip (supabase)")
+    args = parser.parse_args(argv)
+
+    if args.backend == "supabase":
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from fake_supabase import FakeSupabase
+
+        store = SupabaseStorage(FakeSupabase(latency=args.latency_ms / 1000))
+    else:
+        db = args.db or str(Path(tempfile.mkdtemp()) / "race.sqlite3")
+        store = SQLiteStorage(db, pool_size=args.threads)
+    day = datetime.date.today().isoformat()
+    user_ids = [store.upsert_user(f"race-{i}")["id"] for i in range(args.users)]
+
+    seen, created = hammer(store, user_ids, args.threads, day)
+
+    failures = []
+    for uid in user_ids:
+        rows = [r for r in store.fetch_user_rows(uid, days=0) if r["log_date"] == day]
+        if len(rows) != 1 or seen[uid] != {rows[0]["id"]} or created[uid] != 1:
+            failures.append((uid, len(rows), sorted(seen[uid]), created[uid]))
+    submissions = args.users * args.threads
+    if failures:
+        for uid, n, ids, creations in failures:
+            print(f"FAIL {uid}: {n} rows today, handed back ids {ids}, {creations} reported created")
+        sys.exit(1)
+    print(f"ok ({args.backend}): {submissions} submissions from {args.threads} threads "
+          f"-> one row per user ({args.users} users)")
+
+
+if __name__ == "__main__":
+    main()
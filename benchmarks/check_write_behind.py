@@ -0,0 +1,234 @@
+"""Check `WriteBehindQueue` and the repository's read-your-writes overlay.
+
+Each check drives a queue against an in-memory recording store (or SQLite for
+the level points) and exits non-zero on the first broken expectation:
+
+- coalescing: repeated updates to a row merge into one write, identical
+  payloads for different rows share one `update_logs` call
+- retry / drop: a failing write backs off exponentially, is retried once
+  due, and is only dropped after failing for `give_up_after` seconds; `close()`
+  tries a backing-off row once more
+- drain: `close()` writes everything still pending
+- flush race: a `flush()` on a script thread never lets the worker's older
+  payload for a row land after a newer one
+- level points: a write landing between the window and the points read is
+  counted once, not twice, and another user's stalled write neither blocks
+  the read nor forces a re-read
+
+    python benchmarks/check_write_behind.py
+"""
+
+import argparse
+import datetime
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mood_and_move.levels import level_points  # noqa: E402
+from mood_and_move.repository import LogRepository  # noqa: E402
+from mood_and_move.storage import SQLiteStorage  # noqa: E402
+from mood_and_move.writebehind import WriteBehindQueue  # noqa: E402
+
+
+class RecordingStore:
+    """`update_logs` into a dict, optionally failing the first `fail` calls or sleeping."""
+
+    def __init__(self, fail: int = 0, delay: float = 0.0):
+        self.fail = fail
+        self.delay = delay
+        self.calls = []
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    def update_logs(self, row_ids, payload: dict):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls.append((tuple(row_ids), dict(payload)))
+            if self.fail:
+                self.fail -= 1
+                raise ConnectionError("backend down")
+            for row_id in row_ids:
+                self.rows.setdefault(row_id, {}).update(payload)
+
+
+def expect(ok: bool, what: str):
+    if not ok:
+        sys.exit(f"FAIL {what}")
+    print(f"ok: {what}")
+
+
+def check_coalescing():
+    store = RecordingStore()
+    queue = WriteBehindQueue(store, flush_interval=60)
+    queue.submit(1, {"completed": True})
+    queue.submit(1, {"points_delta": 1})
+    queue.submit(2, {"completed": True, "points_delta": 1})
+    expect(queue.pending(1) == {"completed": True, "points_delta": 1}, "pending values merged per row")
+    queue.flush()
+    expect(store.calls == [((1, 2), {"completed": True, "points_delta": 1})],
+           "3 updates to 2 rows -> one update_logs call")
+    expect(queue.stats()["coalesced"] == 1 and queue.pending(1) is None, "coalesced count, nothing left pending")
+    queue.close()
+
+
+def check_retry_and_drop():
+    now = [0.0]
+    store = RecordingStore(fail=1)
+    queue = WriteBehindQueue(store, flush_interval=60, retry_base=1.0, clock=lambda: now[0])
+    queue.submit(1, {"completed": True, "points_delta": 1})
+    queue.flush()
+    expect(store.rows == {} and queue.stats()["retrying"] == 1 and queue.pending(1) is not None,
+           "failed write backs off, still pending and overlaid")
+    now[0] = 1.0
+    queue.flush()
+    expect(store.rows == {1: {"completed": True, "points_delta": 1}} and queue.stats()["failures"] == 1,
+           "retried once due and written")
+    queue.close()
+
+    now[0] = 0.0
+    store = RecordingStore(fail=10_000)
+    queue = WriteBehindQueue(store, flush_interval=60, retry_base=1.0, retry_max=60.0, give_up_after=600.0,
+                             clock=lambda: now[0])
+    queue.submit(1, {"completed": True, "points_delta": 1})
+    while now[0] < 599:
+        queue.flush()
+        now[0] += 1.0
+    attempts = len(store.calls)
+    expect(queue.stats()["dropped"] == 0 and 10 <= attempts <= 20,
+           f"still queued after 599 s of failures, {attempts} attempts with backoff")
+    now[0] = 700.0
+    queue.flush()
+    stats = queue.stats()
+    expect(stats["dropped"] == 1 and stats["pending"] == 0, "dropped once failing for give_up_after")
+
+    queue.submit(2, {"completed": True})
+    queue.flush()
+    store.fail = 0
+    queue.close()
+    expect(store.rows == {2: {"completed": True}}, "close() retries a backing-off row once more")
+
+
+def check_drain():
+    store = RecordingStore()
+    queue = WriteBehindQueue(store, flush_interval=60, batch_size=1000)
+    for row_id in range(250):
+        queue.submit(row_id, {"points_delta": row_id % 2})
+    queue.close()
+    expect(len(store.rows) == 250 and queue.stats()["pending"] == 0, "close() drains 250 pending rows")
+
+
+def check_flush_race():
+    # the worker's write of n=0 stalls; meanwhile n=1 is submitted and flushed
+    # from this thread, which must not land before the stale n=0 does
+    store = RecordingStore()
+    started, release = threading.Event(), threading.Event()
+    update_logs = store.update_logs
+
+    def stalling(row_ids, payload):
+        if payload == {"n": 0}:
+            started.set()
+            release.wait(5)
+        update_logs(row_ids, payload)
+
+    store.update_logs = stalling
+    queue = WriteBehindQueue(store, flush_interval=0.01)
+    queue.submit(1, {"n": 0})
+    started.wait(5)
+    queue.submit(1, {"n": 1})
+    flusher = threading.Thread(target=queue.flush)
+    flusher.start()
+    time.sleep(0.05)
+    release.set()
+    flusher.join()
+    queue.close()
+    expect(store.rows[1] == {"n": 1}, "flush() racing the worker keeps the newest payload")
+
+
+def check_level_points():
+    store = SQLiteStorage(str(Path(tempfile.mkdtemp()) / "wb.sqlite3"))
+    user_id = store.upsert_user("wb")["id"]
+    day = datetime.date.today().isoformat()
+    row, _ = store.submit_log(user_id, day, {"emotion": "집중", "completed": False, "points_delta": 0})
+    queue = WriteBehindQueue(store, flush_interval=60)
+    queue.submit(row["id"], {"completed": True, "points_delta": 1})
+
+    logs = LogRepository(store, user_id, writes=queue)
+    reads = []
+
+    def read():
+        # the window still sees the queued value; the write lands before the points read
+        logs.rows()
+        if not reads:
+            queue.flush()
+        reads.append(store.emotion_points(user_id))
+        return reads[-1]
+
+    stored = logs.read_consistent(read)
+    points = level_points(stored, logs.points_adjustment())
+    expect(points.get("집중") == 1 and len(reads) == 2,
+           "write landing between window and points read counted once (re-read)")
+
+    logs.update_row(row["id"], {"points_delta": 2})
+    queue.flush()  # lands after the consistent read: not in `stored`, still in the overlay
+    points = level_points(stored, logs.points_adjustment())
+    expect(points.get("집중") == 2, "update after the read counted once")
+    queue.close()
+
+
+def check_other_users_write():
+    store = SQLiteStorage(str(Path(tempfile.mkdtemp()) / "wb.sqlite3"))
+    day = datetime.date.today().isoformat()
+    a, b = (store.upsert_user(name)["id"] for name in ("a", "b"))
+    row_a, _ = store.submit_log(a, day, {"emotion": "집중", "completed": False, "points_delta": 0})
+    store.submit_log(b, day, {"emotion": "집중", "completed": True, "points_delta": 1})
+
+    started, release = threading.Event(), threading.Event()
+    update_logs = store.update_logs
+
+    def stalling(row_ids, payload):
+        started.set()
+        release.wait(5)
+        update_logs(row_ids, payload)
+
+    store.update_logs = stalling
+    queue = WriteBehindQueue(store, flush_interval=0.01)
+    queue.submit(row_a["id"], {"completed": True, "points_delta": 1})
+    started.wait(5)
+
+    logs = LogRepository(store, b, writes=queue)
+    reads = []
+
+    def read():
+        logs.rows()
+        reads.append(store.emotion_points(b))
+        return reads[-1]
+
+    t0 = time.perf_counter()
+    logs.read_consistent(read)
+    elapsed = time.perf_counter() - t0
+    release.set()
+    queue.close()
+    expect(len(reads) == 1 and elapsed < 0.5,
+           f"user A's stalled write: user B read once in {elapsed * 1000:.0f} ms")
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args(argv)
+    logging.getLogger("mood_and_move.writebehind").setLevel(logging.CRITICAL)  # failures are expected
+
+    check_coalescing()
+    check_retry_and_drop()
+    check_drain()
+    check_flush_race()
+    check_level_points()
+    check_other_users_write()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""In-memory stand-in for the supabase-py client, for headless benchmarks.
+
+Implements the slice of the PostgREST query builder that `SupabaseStorage`
+uses (select / upsert / update, eq / gte / in_ / or_ filters, order, limit,
+exact counts) plus the `emotion_distribution` RPC, over plain lists guarded
+by a lock. `user_emotion_points` is derived from `logs` on read, as the
+database trigger would keep it.
+
+Every `execute()` is recorded as a `Call` with the operation, the calling
+thread, rows and JSON bytes returned, so a benchmark can attribute backend
+traffic to each rerun. `latency` adds a fixed sleep per call to stand in for
+the network round trip.
+"""
+
+import datetime
+import json
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from mood_and_move.storage import aggregate_emotions
+
+LOG_DEFAULTS = {"emotion": None, "choice_key": None, "question_id": None, "quote_id": None,
+                "challenge_id": None, "completed": False, "points_delta": 0}
+_LEAF = re.compile(r"^([a-z_]+)\.(eq|neq|gt|gte|lt|lte)\.(.*)$")
+
+
+@dataclass(frozen=True)
+class Call:
+    op: str
+    thread: str
+    rows: int
+    bytes: int
+    seconds: float
+
+
+def _value(v):
+    if isinstance(v, bool) or v is None:
+        return (0, str(v))
+    if isinstance(v, (int, float)):
+        return (1, v)
+    s = str(v)
+    return (1, int(s)) if s.lstrip("-").isdigit() else (2, s)
+
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def _split_top(expr: str) -> list:
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(expr):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return parts
+
+
+def _logic(expr: str):
+    """Predicate for a PostgREST logic tree such as `a.gt.1,and(a.eq.1,id.gt.2)` (OR at top)."""
+    def node(term):
+        for kind, combine in (("and(", all), ("or(", any)):
+            if term.startswith(kind) and term.endswith(")"):
+                preds = [node(t) for t in _split_top(term[len(kind):-1])]
+                return lambda row: combine(p(row) for p in preds)
+        m = _LEAF.match(term)
+        if not m:
+            raise ValueError(f"unsupported filter: {term}")
+        col, op, raw = m.groups()
+        return lambda row: _OPS[op](_value(row.get(col)), _value(raw))
+
+    preds = [node(t) for t in _split_top(expr)]
+    return lambda row: any(p(row) for p in preds)
+
+
+class _Query:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.limit_n = None
+        self.count = None
+        self.returning = "representation"
+        self.on_conflict = None
+        self.ignore_duplicates = False
+
+    # ---------- builders ----------
+    def select(self, columns="*", count=None):
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self.count = count
+        return self
+
+    def upsert(self, payload, on_conflict="", ignore_duplicates=False, returning="representation",
+               count=None, default_to_null=True):
+        self.action = "upsert"
+        self.payload = payload if isinstance(payload, list) else [payload]
+        self.on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()]
+        self.ignore_duplicates = ignore_duplicates
+        self.returning = str(getattr(returning, "value", returning))
+        self.count = count
+        return self
+
+    def update(self, payload, returning="representation", count=None):
+        self.action = "update"
+        self.payload = dict(payload)
+        self.returning = str(getattr(returning, "value", returning))
+        self.count = count
+        return self
+
+    def eq(self, col, value):
+        self.filters.append(lambda row: _value(row.get(col)) == _value(value))
+        return self
+
+    def gte(self, col, value):
+        self.filters.append(lambda row: _value(row.get(col)) >= _value(value))
+        return self
+
+    def in_(self, col, values):
+        wanted = {_value(v) for v in values}
+        self.filters.append(lambda row: _value(row.get(col)) in wanted)
+        return self
+
+    def or_(self, expr):
+        self.filters.append(_logic(expr))
+        return self
+
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def execute(self):
+        return self.db._execute(f"{self.table}.{self.action}", self._run)
+
+    # ---------- evaluation (called with the db lock held) ----------
+    def _matching(self, rows):
+        return [r for r in rows if all(f(r) for f in self.filters)]
+
+    def _run(self):
+        if self.action == "select":
+            rows = self._matching(self.db._rows(self.table))
+            for col, desc in reversed(self.orders):
+                rows.sort(key=lambda r: _value(r.get(col)), reverse=desc)
+            total = len(rows)
+            if self.limit_n is not None:
+                rows = rows[: self.limit_n]
+            data = [{c: r.get(c) for c in self.columns} if self.columns else dict(r) for r in rows]
+            return data, total if self.count else None
+        if self.action == "update":
+            rows = self._matching(self.db.tables[self.table])
+            for r in rows:
+                r.update(self.payload)
+            data = [] if self.returning == "minimal" else [dict(r) for r in rows]
+            return data, len(rows) if self.count else None
+        affected = [self.db._upsert_one(self.table, row, self.on_conflict, self.ignore_duplicates)
+                    for row in self.payload]
+        affected = [r for r in affected if r is not None]
+        data = [] if self.returning == "minimal" else [dict(r) for r in affected]
+        return data, len(affected) if self.count else None
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables = {"users": [], "logs": []}
+        self.calls = []
+        self._lock = threading.RLock()
+        self._next_log_id = 1
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def from_(self, name: str) -> _Query:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: dict = None):
+        if fn != "emotion_distribution":
+            raise ValueError(f"unknown rpc: {fn}")
+        since = (params or {}).get("since") or datetime.date.min.isoformat()
+
+        def run():
+            rows = [r for r in self.tables["logs"] if str(r["log_date"]) >= since]
+            return aggregate_emotions(rows), None
+
+        return SimpleNamespace(execute=lambda: self._execute(f"rpc.{fn}", run))
+
+    # ---------- stats ----------
+    def mark(self) -> int:
+        with self._lock:
+            return len(self.calls)
+
+    def calls_since(self, mark: int) -> list:
+        with self._lock:
+            return self.calls[mark:]
+
+    # ---------- internals ----------
+    def _execute(self, op: str, run):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            data, count = run()
+            body = json.dumps(data, ensure_ascii=False, default=str).encode()
+            self.calls.append(Call(op, threading.current_thread().name, len(data), len(body),
+                                   time.perf_counter() - started))
+        return SimpleNamespace(data=data, count=count)
+
+    def _rows(self, table: str) -> list:
+        if table != "user_emotion_points":
+            return self.tables[table]
+        points = {}
+        for r in self.tables["logs"]:
+            if r.get("emotion") is not None:
+                key = (r["user_id"], r["emotion"])
+                points[key] = points.get(key, 0) + int(r.get("points_delta") or 0)
+        return [{"user_id": u, "emotion": e, "points": p} for (u, e), p in points.items()]
+
+    def _upsert_one(self, table: str, row: dict, on_conflict, ignore_duplicates):
+        rows = self.tables[table]
+        if on_conflict:
+            key = tuple(_value(row.get(c)) for c in on_conflict)
+            existing = next((r for r in rows if tuple(_value(r.get(c)) for c in on_conflict) == key), None)
+            if existing is not None:
+                if ignore_duplicates:
+                    return None
+                existing.update(row)
+                return existing
+        if table == "users":
+            new = {"id": str(uuid.uuid4()), **row}
+        else:
+            new = {"id": self._next_log_id, **LOG_DEFAULTS, **row}
+            self._next_log_id += 1
+        rows.append(new)
+        return new
@@ -0,0 +1,11 @@
+"""Mood & Move core helpers shared by the Streamlit app and offline tools.
+
+Nothing here imports Streamlit, so every module can be used from scripts,
+workers and benchmarks:
+
+- `catalog`: compiled data.json (quotes / challenges per emotion)
+- `inference`: the daily question bank and answer -> emotion inference
+- `recommend`: cooldown-aware quote / challenge selection
+- `levels`: points -> level and progress
+- `storage`: Supabase / SQLite backends; `repository.LogRepository` on top
+"""
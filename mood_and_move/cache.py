@@ -0,0 +1,93 @@
+"""Process-wide caches shared by every Streamlit session.
+
+Each cache registers itself by name so hit/miss counters for all of them can be
+read from one place with `cache_stats()`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+_registry = {}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 128, clock=time.monotonic):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0  # bumped by invalidate(); see get_or_compute
+        _registry[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > self._clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for `key`, else `compute()`'s result, cached.
+
+        If the cache is invalidated while `compute()` runs, its result may
+        predate the write that invalidated it: it is returned but not cached.
+        """
+        with self._lock:
+            generation = self._generation
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            with self._lock:
+                if self._generation == generation:
+                    self._store(key, value)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """Drop one key, or every entry when called without arguments."""
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self.invalidations += 1
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._data),
+            }
+
+
+def cache_stats() -> dict:
+    """Counters for every registered cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in list(_registry.items())}
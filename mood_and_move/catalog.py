@@ -0,0 +1,118 @@
+"""Compiled, read-only view of data.json.
+
+`compile_catalog` turns the raw JSON into per-emotion `ItemPool`s with id
+lookups, items pre-sorted by difficulty, difficulty tiers and cooldowns as
+integer arrays, so lookups and picks do not rescan or re-sort item lists on
+every request.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import numpy as np
+
+EMOTIONS = ("행복", "불안", "분노", "무기력", "슬픔", "집중")  # display order
+
+
+def _frozen_array(values) -> np.ndarray:
+    arr = np.asarray(values, dtype=np.int64)
+    arr.setflags(write=False)
+    return arr
+
+
+@dataclass(frozen=True)
+class ItemPool:
+    """Quotes or challenges for one emotion, ordered by difficulty (stable)."""
+
+    items: tuple
+    by_id: Mapping[str, Mapping]
+    index: Mapping[str, int]
+    difficulty: np.ndarray
+    cooldown: np.ndarray
+    tiers: Mapping[int, tuple]
+
+    @classmethod
+    def compile(cls, raw_items) -> "ItemPool":
+        items = tuple(
+            MappingProxyType(dict(it))
+            for it in sorted(raw_items, key=lambda x: x.get("difficulty", 1))
+        )
+        index = {it["id"]: i for i, it in enumerate(items)}
+        if len(index) != len(items):
+            raise ValueError("duplicate item id in catalog")
+        tiers = {}
+        for it in items:
+            tiers.setdefault(int(it.get("difficulty", 1)), []).append(it)
+        return cls(
+            items=items,
+            by_id=MappingProxyType({it["id"]: it for it in items}),
+            index=MappingProxyType(index),
+            difficulty=_frozen_array([it.get("difficulty", 1) for it in items]),
+            cooldown=_frozen_array([it.get("cooldown_days", 0) for it in items]),
+            tiers=MappingProxyType({d: tuple(tier) for d, tier in tiers.items()}),
+        )
+
+    def get(self, item_id) -> Optional[Mapping]:
+        return self.by_id.get(item_id)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+@dataclass(frozen=True)
+class EmotionContent:
+    color: Optional[str]
+    quotes: ItemPool
+    challenges: ItemPool
+
+
+@dataclass(frozen=True)
+class Catalog:
+    emotions: tuple
+    by_emotion: Mapping[str, EmotionContent]
+    items_by_id: Mapping[str, Mapping]
+
+    def __getitem__(self, emotion: str) -> EmotionContent:
+        return self.by_emotion[emotion]
+
+    def __contains__(self, emotion) -> bool:
+        return emotion in self.by_emotion
+
+    def keys(self):
+        return self.by_emotion.keys()
+
+    def item(self, item_id) -> Optional[Mapping]:
+        return self.items_by_id.get(item_id)
+
+    def ordered_emotions(self, preferred=EMOTIONS) -> list:
+        """Emotions in `preferred` order, or catalog order if none are known."""
+        return [e for e in preferred if e in self.by_emotion] or list(self.emotions)
+
+
+def compile_catalog(raw: dict) -> Catalog:
+    by_emotion = {}
+    items_by_id = {}
+    for emo, content in raw.items():
+        quotes = ItemPool.compile(content.get("quotes", []))
+        challenges = ItemPool.compile(content.get("challenges", []))
+        for pool in (quotes, challenges):
+            for item_id, it in pool.by_id.items():
+                if item_id in items_by_id:
+                    raise ValueError(f"duplicate item id in catalog: {item_id}")
+                items_by_id[item_id] = it
+        by_emotion[emo] = EmotionContent(content.get("color"), quotes, challenges)
+    return Catalog(
+        emotions=tuple(raw.keys()),
+        by_emotion=MappingProxyType(by_emotion),
+        items_by_id=MappingProxyType(items_by_id),
+    )
+
+
+def load_catalog(path: Path) -> Catalog:
+    return compile_catalog(json.loads(Path(path).read_text(encoding="utf-8")))
@@ -0,0 +1,28 @@
+"""Shared plumbing for the command-line tools (rollup, import, export)."""
+
+import os
+import sys
+
+
+def client_from_env():
+    """Supabase client from SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_ANON_KEY)."""
+    from .client import create_supabase_client
+
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
+    if not url or not key:
+        sys.exit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set.")
+    return create_supabase_client(url, key)
+
+
+def add_storage_args(parser):
+    parser.add_argument("--backend", choices=("supabase", "sqlite"), default="supabase")
+    parser.add_argument("--sqlite-path", default="mood_and_move.sqlite3", help="database file for --backend sqlite")
+
+
+def storage_from_args(args):
+    from .storage import make_storage
+
+    if args.backend == "sqlite":
+        return make_storage("sqlite", path=args.sqlite_path)
+    return make_storage("supabase", client=client_from_env())
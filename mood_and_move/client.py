@@ -0,0 +1,186 @@
+"""Supabase client factory with a tunable, shared HTTP connection pool.
+
+`create_client` from supabase-py builds its PostgREST session with httpx
+defaults. `create_supabase_client` instead routes every PostgREST request
+through one `PooledTransport` per process, which gives us:
+
+- pool limits and keep-alive expiry (`HttpConfig`)
+- separate connect / read / pool-wait timeouts, so one slow response cannot
+  hold a session forever
+- retry with exponential backoff on connection errors and transient 5xx
+- HTTP/2 when the `h2` package is installed
+- in-flight / saturation counters via `pool_stats()`
+"""
+
+import importlib.util
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+
+import httpx
+
+# GET/HEAD are always safe to resend. Other methods are only retried when the
+# request cannot have reached PostgREST (connect failures) or PostgREST
+# reports it never reached the database (503).
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {502, 503, 504}
+SAFE_RETRY_STATUSES = {503}
+
+
+def _coerce(kind, value):
+    if kind is bool and isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return kind(value)
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0
+    retries: int = 2
+    backoff: float = 0.2
+    http2: bool = True
+
+    @classmethod
+    def from_mapping(cls, options) -> "HttpConfig":
+        """Config from e.g. the `[supabase_http]` secrets.
+
+        Unknown keys are ignored; values are coerced to the field types
+        ("20" -> 20, "false" -> False).
+        """
+        types = {f.name: f.type for f in fields(cls)}
+        return cls(**{k: _coerce(types[k], v) for k, v in dict(options or {}).items() if k in types})
+
+    @property
+    def use_http2(self) -> bool:
+        return self.http2 and importlib.util.find_spec("h2") is not None
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout,
+                             write=self.write_timeout, pool=self.pool_timeout)
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+
+class PooledTransport(httpx.BaseTransport):
+    """httpx transport adding retries and pool occupancy counters."""
+
+    def __init__(self, config: HttpConfig, sleep=time.sleep):
+        self.config = config
+        self._inner = httpx.HTTPTransport(http2=config.use_http2, limits=config.limits())
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.saturated = 0
+        self.pool_timeouts = 0
+
+    def _enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.in_flight > self.config.max_connections:
+                self.saturated += 1
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _retryable(self, request: httpx.Request, exc=None, status=None) -> bool:
+        if exc is not None:
+            if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+                return True
+            return isinstance(exc, httpx.TransportError) and request.method in IDEMPOTENT_METHODS
+        if request.method in IDEMPOTENT_METHODS:
+            return status in RETRY_STATUSES
+        return status in SAFE_RETRY_STATUSES
+
+    def _backoff(self, attempt: int):
+        delay = self.config.backoff * (2 ** attempt)
+        self._sleep(delay * (0.5 + random.random() / 2))
+        with self._lock:
+            self.retries += 1
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._enter()
+        try:
+            for attempt in range(self.config.retries + 1):
+                last = attempt == self.config.retries
+                try:
+                    response = self._inner.handle_request(request)
+                except httpx.PoolTimeout:
+                    with self._lock:
+                        self.pool_timeouts += 1
+                    raise
+                except httpx.TransportError as exc:
+                    if last or not self._retryable(request, exc=exc):
+                        raise
+                    self._backoff(attempt)
+                    continue
+                if last or not self._retryable(request, status=response.status_code):
+                    return response
+                response.close()
+                self._backoff(attempt)
+        finally:
+            self._exit()
+
+    def close(self):
+        self._inner.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "max_connections": self.config.max_connections,
+                "saturation": self.in_flight / self.config.max_connections,
+                "saturated_requests": self.saturated,
+                "pool_timeouts": self.pool_timeouts,
+                "requests": self.requests,
+                "retries": self.retries,
+                "http2": self.config.use_http2,
+            }
+
+
+_transports = []
+
+
+def pool_stats() -> list:
+    """Counters for every transport created in this process."""
+    return [t.stats() for t in list(_transports)]
+
+
+def create_supabase_client(url: str, key: str, config: HttpConfig = None):
+    """`supabase.create_client` whose PostgREST requests share a `PooledTransport`."""
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient as PostgrestSession
+    from supabase import Client, ClientOptions
+
+    config = config or HttpConfig()
+    transport = PooledTransport(config)
+    _transports.append(transport)
+
+    class PooledPostgrestClient(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout, verify=True):
+            return PostgrestSession(base_url=base_url, headers=headers, timeout=config.timeout(),
+                                    follow_redirects=True, transport=transport)
+
+    class PooledClient(Client):
+        # supabase-py rebuilds the PostgREST client on auth events; keep it on our pool
+        def _init_postgrest_client(self, rest_url, headers, schema, timeout=None, verify=True):
+            return PooledPostgrestClient(rest_url, headers=headers, schema=schema, verify=verify)
+
+    options = ClientOptions(postgrest_client_timeout=config.timeout())
+    return PooledClient(url, key, options)
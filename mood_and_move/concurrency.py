@@ -0,0 +1,55 @@
+"""Run independent backend queries of one rerun concurrently.
+
+supabase-py's sync client blocks on each `execute()`; the queries a rerun makes
+(the user's log window, level points, the global aggregate) do not depend on
+each other, so they are issued on a shared thread pool and joined before
+rendering. Callables must not touch `st.*` — they run outside the script thread.
+Each call runs in a copy of the caller's context, so context variables (the
+current rerun's query counters) follow it into the pool.
+
+The pool is process-wide and sized like the HTTP connection pool, so it never
+becomes the bottleneck; the concurrency limit applies per `gather` call (one
+rerun), not to the process. Calls made outside `gather` (login, writes,
+export) do not go through the pool at all.
+"""
+
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class QueryExecutor:
+    """Shared worker pool; each `gather` keeps at most `per_call` of its calls in flight."""
+
+    def __init__(self, max_workers: int = 20, per_call: int = 4):
+        self.max_workers = max(1, int(max_workers))
+        self.per_call = max(1, int(per_call))
+        self._pool = None
+        if self.max_workers > 1 and self.per_call > 1:
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="backend-io")
+
+    def gather(self, **calls) -> dict:
+        """Run zero-argument callables concurrently; returns {name: result}.
+
+        The exception of the call that failed first (in completion order) is
+        re-raised once every call has finished. Without a pool the calls run
+        one after another and the first failure stops the rest.
+        """
+        if self._pool is None or len(calls) <= 1:
+            return {name: fn() for name, fn in calls.items()}
+        pending = list(calls.items())
+        futures, running, error = {}, set(), None
+        while pending or running:
+            while pending and len(running) < self.per_call:
+                name, fn = pending.pop(0)
+                futures[name] = self._pool.submit(contextvars.copy_context().run, fn)
+                running.add(futures[name])
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            if error is None:
+                error = next((f.exception() for f in done if f.exception() is not None), None)
+        if error is not None:
+            raise error
+        return {name: fut.result() for name, fut in futures.items()}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -0,0 +1,105 @@
+"""Streaming export of one user's full log history.
+
+Rows are read with keyset pagination (`Storage.iter_user_pages`) and written
+page by page as CSV, JSONL or Parquet, so memory stays at one page no matter
+how long the history is.
+
+    python -m mood_and_move.export kim -o kim.csv
+    python -m mood_and_move.export kim --format parquet -o kim.parquet --backend sqlite
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+
+from .cli import add_storage_args, storage_from_args
+
+EXPORT_FIELDS = ("log_date", "emotion", "choice_key", "question_id", "quote_id",
+                 "challenge_id", "completed", "points_delta")
+FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+
+def _text(out, encoding="utf-8"):
+    return io.TextIOWrapper(out, encoding=encoding, newline="", write_through=True)
+
+
+def write_csv(pages, out) -> int:
+    # utf-8-sig so spreadsheet apps pick up the Korean emotion labels
+    text = _text(out, "utf-8-sig")
+    writer = csv.DictWriter(text, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for page in pages:
+        writer.writerows(page)
+        n += len(page)
+    text.detach()
+    return n
+
+
+def write_jsonl(pages, out) -> int:
+    text = _text(out)
+    n = 0
+    for page in pages:
+        for row in page:
+            text.write(json.dumps({k: row.get(k) for k in EXPORT_FIELDS}, ensure_ascii=False))
+            text.write("\n")
+        n += len(page)
+    text.detach()
+    return n
+
+
+def write_parquet(pages, out) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(f, pa.bool_() if f == "completed" else pa.int64() if f == "points_delta" else pa.string())
+                        for f in EXPORT_FIELDS])
+    n = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for page in pages:
+            writer.write_table(pa.Table.from_pylist([{k: r.get(k) for k in EXPORT_FIELDS} for r in page], schema))
+            n += len(page)
+    return n
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+def export_user(store, user_id: str, fmt: str, out, page_size: int = 1000, pending=None) -> int:
+    """Write the user's whole history to binary stream `out`; returns the row count.
+
+    `pending(row_id)` (`WriteBehindQueue.pending`) overlays values not written yet.
+    """
+    pages = store.iter_user_pages(user_id, fields=(EXPORT_FIELDS,), page_size=page_size)
+    if pending is not None:
+        pages = ([{**r, **(pending(r["id"]) or {})} for r in page] for page in pages)
+    return WRITERS[fmt](pages, out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export one user's full mood log history.")
+    parser.add_argument("username")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from -o extension, else csv")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    add_storage_args(parser)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or next((f for f in FORMATS if args.output.endswith("." + f)), "csv")
+    store = storage_from_args(args)
+    user = store.find_user(args.username)
+    if user is None:
+        sys.exit(f"no such user: {args.username}")
+    if args.output == "-":
+        n = export_user(store, user["id"], fmt, sys.stdout.buffer, args.page_size)
+    else:
+        with open(args.output, "wb") as out:
+            n = export_user(store, user["id"], fmt, out, args.page_size)
+    print(f"exported {n} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
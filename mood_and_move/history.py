@@ -0,0 +1,21 @@
+"""Last-shown dates per quote/challenge id, built from a user's log frame."""
+
+import pandas as pd
+
+ITEM_COLUMNS = ("quote_id", "challenge_id")
+
+
+def build_history_from_df(df: pd.DataFrame) -> dict:
+    """Map item id -> latest `log_date` (as `datetime.datetime`) it was shown on."""
+    cols = [c for c in ITEM_COLUMNS if c in df.columns]
+    if df.empty or not cols or "log_date" not in df.columns:
+        return {}
+    dates = pd.to_datetime(df["log_date"].astype(str), format="ISO8601", errors="coerce")
+    long = (
+        df[cols]
+        .assign(log_date=dates)
+        .melt(id_vars="log_date", value_vars=cols, value_name="item_id")
+        .dropna(subset=["item_id", "log_date"])
+    )
+    latest = long.groupby("item_id", sort=False)["log_date"].max()
+    return {item_id: ts.to_pydatetime() for item_id, ts in latest.items()}
@@ -0,0 +1,158 @@
+"""Bulk import of historical mood logs from CSV or JSONL.
+
+Each record needs `username` and `log_date` (YYYY-MM-DD); `emotion`,
+`choice_key`, `question_id`, `quote_id`, `challenge_id`, `completed` and
+`points_delta` are optional. Records are read as a stream, users are resolved
+per batch with one bulk upsert, and logs go in as multi-row inserts on a
+thread pool. Re-running an import is safe: rows whose `(user_id, log_date)`
+already exists are skipped.
+
+    python -m mood_and_move.importer old_tracker.csv --batch-size 1000 --workers 4
+    python -m mood_and_move.importer logs.jsonl --backend sqlite --sqlite-path local.sqlite3
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from .cli import add_storage_args, storage_from_args
+
+OPTIONAL_FIELDS = ("emotion", "choice_key", "question_id", "quote_id", "challenge_id")
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    batches: int = 0
+    users: set = field(default_factory=set)
+    seconds: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.invalid - self.inserted
+
+
+def read_records(path, fmt: str = None):
+    """Yield raw dict records from a .csv or .jsonl file without loading it whole."""
+    path = Path(path)
+    fmt = fmt or ("jsonl" if path.suffix in (".jsonl", ".ndjson") else "csv")
+    with path.open(encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def normalize(record: dict):
+    """(username, log row without user_id) or None if the record is unusable."""
+    username = str(record.get("username") or "").strip()
+    try:
+        log_date = datetime.date.fromisoformat(str(record.get("log_date") or "").strip()[:10]).isoformat()
+    except ValueError:
+        return None
+    if not username:
+        return None
+    row = {"log_date": log_date}
+    for key in OPTIONAL_FIELDS:
+        value = record.get(key)
+        if value not in (None, ""):
+            row[key] = str(value)
+    completed = record.get("completed")
+    row["completed"] = completed if isinstance(completed, bool) else str(completed or "").strip().lower() in TRUE_VALUES
+    try:
+        row["points_delta"] = int(record.get("points_delta") or 0)
+    except (TypeError, ValueError):
+        row["points_delta"] = 0
+    return username, row
+
+
+def batches(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_logs(store, records, batch_size: int = 1000, workers: int = 4, progress=None) -> ImportStats:
+    """Import `records` into `store`; at most `workers * 2` batches are held in memory."""
+    stats = ImportStats()
+    user_ids = {}
+    started = time.perf_counter()
+
+    def prepare(chunk):
+        rows, seen = [], set()
+        for record in chunk:
+            stats.read += 1
+            parsed = normalize(record)
+            if parsed is None:
+                stats.invalid += 1
+                continue
+            username, row = parsed
+            rows.append((username, row))
+        missing = {u for u, _ in rows if u not in user_ids}
+        if missing:
+            user_ids.update(store.resolve_users(sorted(missing)))
+        out = []
+        for username, row in rows:
+            key = (username, row["log_date"])
+            if key in seen:
+                continue  # first record for a user/day wins, as in the database
+            seen.add(key)
+            stats.users.add(username)
+            out.append({"user_id": user_ids[username], **row})
+        return out
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="import") as pool:
+        in_flight = set()
+        for chunk in batches(records, batch_size):
+            in_flight.add(pool.submit(store.insert_logs, prepare(chunk)))
+            if len(in_flight) >= max(1, workers) * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stats.inserted += fut.result()
+                    stats.batches += 1
+                if progress:
+                    progress(stats)
+        for fut in in_flight:
+            stats.inserted += fut.result()
+            stats.batches += 1
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import historical mood logs from CSV or JSONL.")
+    parser.add_argument("path", help="input .csv or .jsonl file")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=None, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per multi-row insert")
+    parser.add_argument("--workers", type=int, default=4, help="inserts in flight at once")
+    add_storage_args(parser)
+    args = parser.parse_args(argv)
+
+    store = storage_from_args(args)
+
+    def progress(stats):
+        print(f"\r{stats.read} read, {stats.inserted} inserted", end="", file=sys.stderr, flush=True)
+
+    stats = import_logs(store, read_records(args.path, args.format), args.batch_size, args.workers, progress)
+    print(file=sys.stderr)
+    print(f"read {stats.read} records for {len(stats.users)} users in {stats.seconds:.1f}s: "
+          f"{stats.inserted} inserted, {stats.skipped} already present, {stats.invalid} invalid")
+
+
+if __name__ == "__main__":
+    main()
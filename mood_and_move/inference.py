@@ -0,0 +1,111 @@
+"""Daily one-question quiz: the question bank and emotion inference.
+
+Each option carries per-emotion weights; the answer's emotion is the highest
+weighted one among the catalog's emotions, ties broken at random.
+"""
+
+import random
+from types import MappingProxyType
+
+# 10 questions × 4 options
+QUESTIONS = [
+    {"id": "q1","text": "오늘 가장 듣고 싶은 음악은?",
+     "options":[
+        {"key":"kpop_dance","label":"신나는 K-POP 댄스곡","weights":{"행복":1.0,"집중":0.2}},
+        {"key":"ballad","label":"센치한 발라드","weights":{"슬픔":1.0,"행복":-0.2}},
+        {"key":"rock","label":"에너지 넘치는 락/브릿팝","weights":{"분노":1.0,"행복":0.2}},
+        {"key":"lofi","label":"차분한 로파이 재즈","weights":{"집중":1.0,"불안":-0.2}}
+     ]},
+    {"id": "q2","text": "오늘 가장 보고 싶은 영화는?",
+     "options":[
+        {"key":"romcom","label":"달달한 로맨틱 코미디","weights":{"행복":1.0,"집중":0.2}},
+        {"key":"drama","label":"감정선을 건드리는 드라마","weights":{"슬픔":1.0,"행복":-0.2}},
+        {"key":"action","label":"몰입감 강한 액션 스릴러","weights":{"집중":0.8,"분노":0.6}},
+        {"key":"docu","label":"차분한 다큐멘터리","weights":{"집중":1.0,"불안":-0.2}}
+     ]},
+    {"id": "q3","text": "오늘 읽고 싶은 책은?",
+     "options":[
+        {"key":"selfhelp","label":"동기부여 되는 자기계발서","weights":{"집중":1.0,"행복":0.4}},
+        {"key":"novel","label":"감정에 몰입되는 장편 소설","weights":{"슬픔":0.8,"행복":-0.2}},
+        {"key":"essay","label":"차분한 감성 에세이","weights":{"불안":0.5,"슬픔":0.6}},
+        {"key":"comic","label":"가볍게 웃을 수 있는 만화","weights":{"행복":1.0,"무기력":-0.3}}
+     ]},
+    {"id": "q4","text": "오늘 여행을 간다면 어디로 가고 싶나요?",
+     "options":[
+        {"key":"beach","label":"햇살 가득한 해변","weights":{"행복":1.0,"집중":0.2}},
+        {"key":"mountain","label":"조용한 산속 트레킹","weights":{"불안":0.8,"집중":0.5}},
+        {"key":"city","label":"활기찬 도심 탐험","weights":{"행복":0.6,"분노":0.4}},
+        {"key":"home","label":"집에서 여유롭게 쉬기","weights":{"무기력":1.0,"슬픔":0.4}}
+     ]},
+    {"id": "q5","text": "오늘 가장 만나고 싶은 친구는?",
+     "options":[
+        {"key":"cheerful","label":"항상 웃고 떠드는 친구","weights":{"행복":1.0,"집중":0.2}},
+        {"key":"listener","label":"내 얘기를 잘 들어주는 친구","weights":{"슬픔":0.8,"행복":0.3}},
+        {"key":"motivator","label":"도전심을 북돋아주는 친구","weights":{"집중":0.8,"행복":0.2}},
+        {"key":"quiet","label":"그냥 옆에만 있어도 편한 친구","weights":{"불안":0.7,"무기력":0.5}}
+     ]},
+    {"id": "q6","text": "오늘 걷고 싶은 동네는?",
+     "options":[
+        {"key":"park","label":"잔디와 벤치가 있는 공원","weights":{"행복":0.8,"불안":0.3}},
+        {"key":"river","label":"물소리 들리는 강변 산책로","weights":{"슬픔":0.7,"집중":0.4}},
+        {"key":"alley","label":"작은 카페가 있는 골목길","weights":{"집중":0.8,"행복":0.4}},
+        {"key":"home","label":"집 주변 단순 산책","weights":{"무기력":1.0,"불안":0.4}}
+     ]},
+    {"id": "q7","text": "지금 타고 싶은 대중교통은?",
+     "options":[
+        {"key":"bus","label":"창밖을 보며 여유 있게 가는 버스","weights":{"불안":0.5,"슬픔":0.5}},
+        {"key":"subway","label":"빠르고 효율적인 지하철","weights":{"집중":1.0,"행복":0.3}},
+        {"key":"bike","label":"시원한 바람을 가르는 자전거","weights":{"행복":0.8,"분노":0.4}},
+        {"key":"walk","label":"느긋하게 걷기","weights":{"무기력":0.6,"슬픔":0.4}}
+     ]},
+    {"id": "q8","text": "오늘 먹고 싶은 음식은?",
+     "options":[
+        {"key":"spicy","label":"매운 음식으로 스트레스 해소","weights":{"분노":1.0,"행복":0.2}},
+        {"key":"sweet","label":"달달한 디저트로 기분전환","weights":{"행복":1.0,"무기력":-0.3}},
+        {"key":"healthy","label":"건강한 샐러드/웰빙식","weights":{"집중":0.8,"불안":0.3}},
+        {"key":"comfort","label":"집밥 같은 편안한 음식","weights":{"무기력":0.8,"슬픔":0.4}}
+     ]},
+    {"id": "q9","text": "지금 당장 하고 싶은 활동은?",
+     "options":[
+        {"key":"exercise","label":"땀나는 운동으로 리프레시","weights":{"행복":0.9,"집중":0.6}},
+        {"key":"sleep","label":"아무것도 안 하고 잠자기","weights":{"무기력":1.0,"슬픔":0.4}},
+        {"key":"study","label":"집중해서 공부/업무하기","weights":{"집중":1.0,"불안":0.4}},
+        {"key":"chat","label":"친구와 수다 떨기","weights":{"행복":1.0,"분노":-0.2}}
+     ]},
+    {"id": "q10","text": "지금 가장 필요한 건?",
+     "options":[
+        {"key":"hug","label":"누군가의 포근한 포옹","weights":{"슬픔":0.9,"행복":0.5}},
+        {"key":"focus","label":"조용하고 집중할 수 있는 공간","weights":{"집중":1.0,"불안":0.4}},
+        {"key":"fun","label":"유쾌한 웃음과 에너지","weights":{"행복":1.0,"집중":0.3}},
+        {"key":"break","label":"아무도 건드리지 않는 혼자만의 휴식","weights":{"무기력":1.0,"불안":0.5}}
+     ]}
+]
+
+QUESTIONS_BY_ID = MappingProxyType({q["id"]: q for q in QUESTIONS})
+
+
+def get_question(qid: str):
+    return QUESTIONS_BY_ID.get(qid)
+
+
+def draw_question(rng=random) -> tuple:
+    """(question id, shuffled option order) for a new day's quiz."""
+    q = rng.choice(QUESTIONS)
+    order = list(range(len(q["options"])))
+    rng.shuffle(order)
+    return q["id"], order
+
+
+def ordered_options(question: dict, order) -> list:
+    return [question["options"][i] for i in order]
+
+
+def infer_emotion_from_choice(choice: dict, emotions, rng=random):
+    """(emotion, scores) for an answer option; `emotions` limits the candidates."""
+    scores = {e: 0.0 for e in emotions}
+    for emo, w in choice["weights"].items():
+        if emo in scores:
+            scores[emo] += w
+    max_val = max(scores.values()) if scores else 0
+    cands = [e for e, v in scores.items() if abs(v - max_val) < 1e-9]
+    return rng.choice(cands) if cands else emotions[0], scores
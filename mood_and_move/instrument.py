@@ -0,0 +1,216 @@
+"""Per-call instrumentation for the Supabase client.
+
+`InstrumentedClient` wraps a supabase-py client: every `execute()` of a
+table query or RPC is timed and recorded with its operation (`logs.select`,
+`rpc.emotion_distribution`, ...), the number of rows returned and its caller
+— the outermost public `Storage` method on the stack (`fetch_user_rows`,
+`submit_log`, `emotion_distribution`, ...).
+
+Calls slower than `slow_ms` are logged at WARNING and kept in a short list;
+`on_record` hooks (metrics) see every record.
+Totals are kept for the process and for the current rerun (`start_rerun`);
+the rerun is tracked in a context variable, which `QueryExecutor` carries
+into its worker threads. Background writes (write-behind) count towards the
+process totals only.
+"""
+
+import contextvars
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+log = logging.getLogger(__name__)
+
+STORAGE_MODULES = frozenset({"mood_and_move.storage"})
+ACTIONS = frozenset({"select", "insert", "upsert", "update", "delete"})
+
+_current_rerun = contextvars.ContextVar("mood_and_move_rerun_queries", default=None)
+
+
+@dataclass(frozen=True)
+class QueryRecord:
+    op: str
+    caller: str
+    seconds: float
+    rows: int
+    ok: bool
+    thread: str
+
+
+class QueryStats:
+    """Call count, time and rows, in total and per caller.
+
+    With `keep_records` every `QueryRecord` is kept too (per-rerun stats only).
+    """
+
+    def __init__(self, keep_records: bool = False):
+        self._lock = threading.Lock()
+        self.records = [] if keep_records else None
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.by_caller = {}  # caller -> [calls, seconds, rows]
+
+    def add(self, rec: QueryRecord):
+        with self._lock:
+            self.calls += 1
+            self.seconds += rec.seconds
+            self.rows += rec.rows
+            self.errors += not rec.ok
+            entry = self.by_caller.setdefault(rec.caller, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += rec.seconds
+            entry[2] += rec.rows
+            if self.records is not None:
+                self.records.append(rec)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "ms": round(self.seconds * 1000, 1),
+                "rows": self.rows,
+                "errors": self.errors,
+                "by_caller": {c: {"calls": n, "ms": round(s * 1000, 1), "rows": r}
+                              for c, (n, s, r) in self.by_caller.items()},
+            }
+
+
+def current_rerun():
+    """`QueryStats` of the rerun running in this context, or None."""
+    return _current_rerun.get()
+
+
+def caller_name(frame) -> str:
+    """Outermost public `Storage` method in the run of storage frames above `frame`.
+
+    Falls back to the first frame outside storage as `module.function`.
+    """
+    while frame is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    public = None
+    while frame is not None and frame.f_globals.get("__name__") in STORAGE_MODULES:
+        name = frame.f_code.co_name
+        if not name.startswith(("_", "<")):
+            public = name
+        frame = frame.f_back
+    if public:
+        return public
+    if frame is None:
+        return "?"
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+
+
+class Instrumentation:
+    def __init__(self, slow_ms: float = 500.0, keep_slow: int = 50, on_record=()):
+        self.slow_ms = slow_ms
+        self.on_record = tuple(on_record)
+        self.totals = QueryStats()
+        self.slow = deque(maxlen=keep_slow)
+        self._lock = threading.Lock()
+        self.reruns = 0
+        self.rerun_calls = 0
+        self.max_rerun_calls = 0
+
+    def start_rerun(self, previous: QueryStats = None) -> QueryStats:
+        """Count calls made from this context (and its executor tasks) from now on.
+
+        Pass the session's previous rerun stats to fold them into the
+        per-rerun totals and log them at DEBUG.
+        """
+        if previous is not None and previous.calls:
+            summary = previous.summary()
+            with self._lock:
+                self.reruns += 1
+                self.rerun_calls += summary["calls"]
+                self.max_rerun_calls = max(self.max_rerun_calls, summary["calls"])
+            log.debug("rerun: %d backend calls, %.1f ms, %d rows %s",
+                      summary["calls"], summary["ms"], summary["rows"], summary["by_caller"])
+        stats = QueryStats(keep_records=True)
+        _current_rerun.set(stats)
+        return stats
+
+    def record(self, rec: QueryRecord):
+        self.totals.add(rec)
+        rerun = _current_rerun.get()
+        if rerun is not None:
+            rerun.add(rec)
+        for hook in self.on_record:
+            hook(rec)
+        if rec.seconds * 1000 >= self.slow_ms:
+            self.slow.append(rec)
+            log.warning("slow query %s from %s: %.0f ms, %d rows%s",
+                        rec.op, rec.caller, rec.seconds * 1000, rec.rows, "" if rec.ok else " (failed)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            reruns = {"reruns": self.reruns, "calls": self.rerun_calls, "max_calls": self.max_rerun_calls,
+                      "mean_calls": (self.rerun_calls / self.reruns) if self.reruns else 0.0}
+        return {"totals": self.totals.summary(), "per_rerun": reruns, "slow_ms": self.slow_ms,
+                "slow": [asdict(r) for r in list(self.slow)]}
+
+
+class _Query:
+    """Proxy for a PostgREST request builder; records `execute()`."""
+
+    __slots__ = ("_inner", "_op", "_instrumentation")
+
+    def __init__(self, inner, op: str, instrumentation: Instrumentation):
+        self._inner = inner
+        self._op = op
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not hasattr(result, "execute"):
+                return result
+            op = f"{self._op}.{name}" if "." not in self._op and name in ACTIONS else self._op
+            return _Query(result, op, self._instrumentation)
+
+        return call
+
+    def execute(self):
+        started = time.perf_counter()
+        ok, rows = False, 0
+        try:
+            res = self._inner.execute()
+            data = getattr(res, "data", None)
+            rows = len(data) if isinstance(data, list) else int(data is not None)
+            ok = True
+            return res
+        finally:
+            self._instrumentation.record(QueryRecord(
+                self._op, caller_name(sys._getframe(1)), time.perf_counter() - started,
+                rows, ok, threading.current_thread().name))
+
+
+class InstrumentedClient:
+    """supabase-py client wrapper recording every query into `instrumentation`."""
+
+    def __init__(self, client, instrumentation: Instrumentation):
+        self._client = client
+        self.instrumentation = instrumentation
+
+    def table(self, name: str) -> _Query:
+        return _Query(self._client.table(name), name, self.instrumentation)
+
+    from_ = table
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)  # AttributeError keeps `hasattr(client, "rpc")` honest
+        if name != "rpc":
+            return attr
+
+        def rpc(fn, *args, **kwargs):
+            return _Query(attr(fn, *args, **kwargs), f"rpc.{fn}", self.instrumentation)
+
+        return rpc
@@ -0,0 +1,34 @@
+"""Per-emotion levels from accumulated points."""
+
+LEVEL_THRESHOLDS = (0, 3, 7, 15, 30, 60)
+
+
+def _level_index(points: int) -> int:
+    idx = 0
+    for i, th in enumerate(LEVEL_THRESHOLDS):
+        if points >= th:
+            idx = i
+    return idx
+
+
+def calc_level(points: int) -> int:
+    return max(1, _level_index(points))
+
+
+def progress_fraction(points: int) -> float:
+    """Progress from the current level's threshold to the next, in [0, 1]."""
+    curr_idx = _level_index(points)
+    if curr_idx == len(LEVEL_THRESHOLDS) - 1:
+        return 1.0
+    curr_th = LEVEL_THRESHOLDS[curr_idx]
+    next_th = LEVEL_THRESHOLDS[curr_idx + 1]
+    span = max(1, next_th - curr_th)
+    return max(0.0, min(1.0, (points - curr_th) / span))
+
+
+def level_points(stored: dict, adjustment: dict = None) -> dict:
+    """Stored points per emotion plus not-yet-written deltas."""
+    points = dict(stored)
+    for emo, delta in (adjustment or {}).items():
+        points[emo] = points.get(emo, 0) + delta
+    return points
@@ -0,0 +1,345 @@
+"""Prometheus-style metrics without a client library.
+
+`Registry` holds counters, gauges and histograms with labels and renders
+them in the Prometheus text exposition format (0.0.4). `CallbackMetric`s
+are read at scrape time, which is how the existing counters (TTL caches,
+active sessions, HTTP pools, the write-behind queue) are exported without double bookkeeping. `AppMetrics`
+declares everything the app reports. A registry can be scraped from a small
+side HTTP server (`serve_http`) or written periodically to a file for the
+node_exporter textfile collector (`TextfileWriter`).
+"""
+
+import http.server
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        """(suffix, label values, extra label pairs, value) tuples."""
+        with self._lock:
+            return [("", key, (), value) for key, value in self._values.items()]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            out = []
+            for key, (counts, total) in self._values.items():
+                for bound, n in zip(self.buckets, counts):
+                    out.append(("_bucket", key, (f'le="{_number(bound)}"',), n))
+                out.append(("_sum", key, (), total))
+                out.append(("_count", key, (), counts[-1]))
+            return out
+
+
+class CallbackMetric(_Metric):
+    """Counter or gauge whose values come from `fn() -> {label values tuple: value}` at scrape time."""
+
+    def __init__(self, name: str, help: str, labelnames, fn, kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self):
+        try:
+            values = self._fn()
+        except Exception:
+            log.exception("metric callback %s failed", self.name)
+            return []
+        return [("", tuple(str(v) for v in key), (), value) for key, value in values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, labelnames, fn, kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, labelnames, fn, kind))
+
+    def exposition(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ActiveSessions:
+    """Sessions seen within the last `window` seconds.
+
+    `_seen` is kept in last-touch order, so expired sessions are dropped from
+    the front on every `touch` too — memory stays bounded without a scraper.
+    """
+
+    def __init__(self, window: float = 300.0, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()  # session id -> last touch, oldest first
+
+    def _prune(self, now: float):
+        cutoff = now - self.window
+        while self._seen and next(iter(self._seen.values())) < cutoff:
+            self._seen.popitem(last=False)
+
+    def touch(self, session_id: str):
+        now = self._clock()
+        with self._lock:
+            self._seen[session_id] = now
+            self._seen.move_to_end(session_id)
+            self._prune(now)
+
+    def count(self) -> int:
+        now = self._clock()
+        with self._lock:
+            self._prune(now)
+            return len(self._seen)
+
+
+# `client.pool_stats()` field, metric kind, help; exported as mood_and_move_http_<field>[_total]
+HTTP_POOL_FIELDS = (
+    ("in_flight", "gauge", "Supabase HTTP requests in flight, by pool."),
+    ("peak_in_flight", "gauge", "Most Supabase HTTP requests in flight at once, by pool."),
+    ("max_connections", "gauge", "Connection limit of the Supabase HTTP pool."),
+    ("requests", "counter", "Supabase HTTP requests, by pool (a retried request counts once)."),
+    ("retries", "counter", "Supabase HTTP requests retried, by pool."),
+    ("saturated_requests", "counter", "Requests that had to wait for a pool connection, by pool."),
+    ("pool_timeouts", "counter", "Requests that timed out waiting for a pool connection, by pool."),
+)
+
+# `WriteBehindQueue.stats()` field, metric kind, help; exported as mood_and_move_write_behind_<field>[_total]
+WRITE_BEHIND_FIELDS = (
+    ("pending", "gauge", "Log updates queued and not yet written."),
+    ("retrying", "gauge", "Queued log updates backing off after a failed write."),
+    ("written", "counter", "Log updates written by the write-behind queue."),
+    ("failures", "counter", "Failed write-behind update_logs calls."),
+    ("dropped", "counter", "Log updates given up on and lost (after retrying, or at shutdown)."),
+)
+
+
+class AppMetrics:
+    """Everything Mood & Move exports, in one registry."""
+
+    def __init__(self, registry: Registry = None, cache_stats=None, pool_stats=None,
+                 session_window: float = 300.0):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.sessions = ActiveSessions(session_window)
+        self.step_seconds = r.histogram(
+            "mood_and_move_step_render_seconds", "Script run time of a rerun, by rendered step.", ("step",))
+        self.backend_seconds = r.histogram(
+            "mood_and_move_backend_seconds", "Backend call latency, by operation.", ("op",))
+        self.backend_errors = r.counter(
+            "mood_and_move_backend_errors_total", "Backend calls that raised, by operation.", ("op",))
+        self.quiz_submissions = r.counter(
+            "mood_and_move_quiz_submissions_total", "Answers that created the day's log, by inferred emotion.", ("emotion",))
+        self.saves = r.counter(
+            "mood_and_move_saves_total", "Result saves, by points_delta written.", ("points_delta",))
+        r.callback("mood_and_move_active_sessions", "Sessions with a rerun in the last window.", (),
+                   lambda: {(): self.sessions.count()})
+        if cache_stats is not None:
+            for field in ("hits", "misses"):
+                r.callback(f"mood_and_move_cache_{field}_total", f"TTL cache {field}, by cache.", ("cache",),
+                           lambda field=field: {(name,): s[field] for name, s in cache_stats().items()},
+                           kind="counter")
+        if pool_stats is not None:
+            for field, kind, help in HTTP_POOL_FIELDS:
+                suffix = "_total" if kind == "counter" else ""
+                r.callback(f"mood_and_move_http_{field}{suffix}", help, ("pool",),
+                           lambda field=field: {(str(i),): s[field] for i, s in enumerate(pool_stats())},
+                           kind=kind)
+
+    def track_write_queue(self, stats):
+        """Export a `WriteBehindQueue`'s counters, read from `stats()` at scrape time."""
+        for field, kind, help in WRITE_BEHIND_FIELDS:
+            suffix = "_total" if kind == "counter" else ""
+            self.registry.callback(f"mood_and_move_write_behind_{field}{suffix}", help, (),
+                                   lambda field=field: {(): stats()[field]}, kind=kind)
+
+    def observe_query(self, rec):
+        """`Instrumentation` hook: one backend call finished."""
+        self.backend_seconds.observe(rec.seconds, op=rec.op)
+        if not rec.ok:
+            self.backend_errors.inc(op=rec.op)
+
+
+# ---------- exposition ----------
+def serve_http(registry: Registry, port: int, host: str = "0.0.0.0") -> http.server.ThreadingHTTPServer:
+    """Serve `GET /metrics` from a daemon thread; returns the server."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_textfile(registry: Registry, path):
+    """Atomically replace `path` with the current exposition."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(registry.exposition())
+    os.replace(tmp, path)
+
+
+class TextfileWriter:
+    """Rewrites a textfile-collector file every `interval` seconds from a daemon thread."""
+
+    def __init__(self, registry: Registry, path, interval: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                write_textfile(self.registry, self.path)
+            except OSError:
+                log.exception("writing metrics to %s failed", self.path)
+            if self._stop.wait(self.interval):
+                return
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        write_textfile(self.registry, self.path)
+
+
+def start_exporters(registry: Registry, port: int = None, path=None, interval: float = 15.0) -> list:
+    """Start whichever of the HTTP endpoint / textfile writer is configured.
+
+    A port already in use (another replica on the host) is logged, not raised.
+    """
+    started = []
+    if port:
+        try:
+            started.append(serve_http(registry, int(port)))
+        except OSError:
+            log.exception("metrics endpoint on port %s not started", port)
+    if path:
+        started.append(TextfileWriter(registry, path, interval))
+    return started
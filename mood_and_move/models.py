@@ -0,0 +1,56 @@
+"""Row models for the Supabase tables and the column sets each reader needs.
+
+Queries select an explicit column list built with `log_columns(...)` rather
+than `*`, so a column added to `logs` never inflates payloads until a reader
+asks for it here.
+"""
+
+from typing import Optional, TypedDict
+
+
+class UserRow(TypedDict):
+    id: str
+    username: str
+
+
+class LogRow(TypedDict, total=False):
+    id: int
+    user_id: str
+    log_date: str
+    emotion: str
+    choice_key: Optional[str]
+    question_id: Optional[str]
+    quote_id: Optional[str]
+    challenge_id: Optional[str]
+    completed: bool
+    points_delta: int
+
+
+USER_FIELDS = tuple(UserRow.__annotations__)
+LOG_FIELDS = tuple(LogRow.__annotations__)
+
+# Per-reader column sets
+HISTORY_FIELDS = ("log_date", "quote_id", "challenge_id")
+TODAY_FIELDS = ("id", "log_date", "emotion", "choice_key", "question_id", "quote_id", "challenge_id", "completed", "points_delta")
+DASHBOARD_FIELDS = ("id", "log_date", "emotion", "completed")
+GLOBAL_FIELDS = ("emotion", "completed")
+
+
+def _columns(known: tuple, groups) -> str:
+    wanted = []
+    for group in groups:
+        for field in group:
+            if field not in known:
+                raise ValueError(f"unknown column: {field}")
+            if field not in wanted:
+                wanted.append(field)
+    return ", ".join(wanted)
+
+
+def log_columns(*groups) -> str:
+    """PostgREST select list for the union of the given field groups, in order."""
+    return _columns(LOG_FIELDS, groups)
+
+
+def user_columns(*groups) -> str:
+    return _columns(USER_FIELDS, groups or (USER_FIELDS,))
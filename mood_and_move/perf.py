@@ -0,0 +1,58 @@
+"""Per-rerun measurements behind the developer perf panel.
+
+`RerunTimer` splits one script run into consecutive named sections; the
+other helpers size session state and diff cache counters between two points
+of a rerun. Nothing here imports Streamlit.
+"""
+
+import pickle
+import sys
+import time
+
+
+class RerunTimer:
+    """Wall time of one rerun, split into consecutive sections.
+
+    `begin(name)` closes the open section and starts the next, which suits a
+    flat Streamlit script better than nested context managers.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self.sections = {}
+        self._open = None
+        self._since = self.started
+
+    def begin(self, name: str):
+        now = self._clock()
+        if self._open is not None:
+            self.sections[self._open] = self.sections.get(self._open, 0.0) + now - self._since
+        self._open, self._since = name, now
+
+    def finish(self) -> float:
+        """Close the open section; returns seconds since the rerun started."""
+        self.begin(None)
+        return self._since - self.started
+
+
+def value_size(value) -> int:
+    """Approximate bytes of a session value: pickled size, else shallow size."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def state_size(state: dict) -> list:
+    """(key, bytes) for every entry, largest first."""
+    return sorted(((str(k), value_size(v)) for k, v in state.items()), key=lambda kv: -kv[1])
+
+
+def cache_deltas(before: dict, after: dict) -> dict:
+    """Hits / misses per cache between two `cache_stats()` snapshots."""
+    out = {}
+    for name, stats in after.items():
+        prev = before.get(name, {})
+        out[name] = {k: stats[k] - prev.get(k, 0) for k in ("hits", "misses")}
+    return out
@@ -0,0 +1,112 @@
+"""Capture one script run with cProfile plus a stack sampler.
+
+cProfile gives exact call counts and times (`.prof`, readable with `pstats`
+or snakeviz). It has no call-stack timeline, so a sampler thread also snaps
+the profiled thread's stack every `interval` seconds; those samples become a
+speedscope flamegraph (https://www.speedscope.app). Only the thread that
+called `start()` is profiled — work handed to `QueryExecutor` shows up as
+time waiting on its futures.
+"""
+
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from pathlib import Path
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class RerunProfiler:
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.elapsed = 0.0
+        self._profile = cProfile.Profile()
+        self._frames = {}  # (name, file, line) -> speedscope frame index
+        self._samples = []
+        self._weights = []
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def start(self) -> "RerunProfiler":
+        target = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, args=(target,), name="rerun-profiler", daemon=True)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def stop(self):
+        self._profile.disable()
+        if self._sampler is not None and not self._stop.is_set():
+            self._stop.set()
+            self._sampler.join()
+            self.elapsed = time.perf_counter() - self._started
+
+    # ---------- sampling ----------
+    def _frame_index(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _sample(self, target: int):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            now = time.perf_counter()
+            if frame is None:
+                last = now
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.append(stack)
+            self._weights.append(now - last)
+            last = now
+
+    # ---------- results ----------
+    def top(self, n: int = 25, sort: str = "cumulative") -> list:
+        """The `n` hottest functions as dicts, by `cumulative` or `tottime`."""
+        stats = pstats.Stats(self._profile).stats
+        rows = []
+        for (filename, line, name), (cc, ncalls, tottime, cumtime, _callers) in stats.items():
+            rows.append({"function": f"{name} ({Path(filename).name}:{line})" if line else name,
+                         "calls": ncalls, "primitive_calls": cc, "tottime": tottime, "cumtime": cumtime})
+        key = "tottime" if sort == "tottime" else "cumtime"
+        return sorted(rows, key=lambda r: -r[key])[:n]
+
+    def speedscope(self, name: str) -> dict:
+        frames = [{"name": fn, "file": file, "line": line} for (fn, file, line) in self._frames]
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "mood_and_move.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self._weights),
+                "samples": self._samples,
+                "weights": self._weights,
+            }],
+        }
+
+    def write(self, directory, name: str) -> tuple:
+        """Write `<name>.prof` and `<name>.speedscope.json`; returns both paths."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        prof = directory / f"{name}.prof"
+        scope = directory / f"{name}.speedscope.json"
+        self._profile.dump_stats(str(prof))
+        scope.write_text(json.dumps(self.speedscope(name)), encoding="utf-8")
+        return prof, scope
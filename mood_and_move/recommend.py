@@ -0,0 +1,75 @@
+"""Cooldown-aware quote/challenge selection over compiled `ItemPool`s.
+
+Eligibility is computed as one vectorized mask over the pool's cooldown array:
+an item is eligible if it was never shown or at least `cooldown_days` whole
+days have passed since it was last shown. Among eligible items the lowest
+difficulty tier wins and one item is drawn at random; if nothing is eligible
+the least-recently-shown item is returned.
+
+History values are day-granular (they come from `log_date`), so day ordinals
+give the same result as `(today - last).days`.
+"""
+
+import random
+
+import numpy as np
+
+from .catalog import EmotionContent, ItemPool
+
+NEVER_SEEN = 0  # day ordinals start at 1, so 0 never collides with a real date
+_NO_TIER = np.iinfo(np.int64).max
+
+
+def last_seen_ordinals(pool: ItemPool, history) -> np.ndarray:
+    """Day ordinal each pool item was last shown (`NEVER_SEEN` if never)."""
+    out = np.full(len(pool), NEVER_SEEN, dtype=np.int64)
+    for item_id, when in history.items():
+        i = pool.index.get(item_id)
+        if i is not None:
+            out[i] = when.toordinal()
+    return out
+
+
+def eligible_mask(pool: ItemPool, last_seen: np.ndarray, today_ordinal: int) -> np.ndarray:
+    """Boolean mask of items off cooldown; `last_seen` may be (items,) or (batch, items)."""
+    return (last_seen == NEVER_SEEN) | ((today_ordinal - last_seen) >= pool.cooldown)
+
+
+def pick_index(pool: ItemPool, last_seen: np.ndarray, today_ordinal: int, rng=random) -> int:
+    mask = eligible_mask(pool, last_seen, today_ordinal)
+    if not mask.any():
+        return int(np.argmin(last_seen))
+    diff = np.where(mask, pool.difficulty, _NO_TIER)
+    tier = np.flatnonzero(diff == diff[np.argmin(diff)])
+    return int(tier[rng.randrange(len(tier))])
+
+
+def pick_indices(pool: ItemPool, last_seen: np.ndarray, today_ordinal: int,
+                 rng: np.random.Generator = None) -> np.ndarray:
+    """Batch form of `pick_index` for a (batch, items) matrix of last-seen ordinals."""
+    rng = rng or np.random.default_rng()
+    mask = eligible_mask(pool, last_seen, today_ordinal)
+    diff = np.where(mask, pool.difficulty, _NO_TIER)
+    tier = diff == diff.min(axis=1, keepdims=True)
+    # random tie-break inside the lowest tier: the highest random key wins
+    keys = np.where(tier, rng.random(diff.shape), -1.0)
+    picks = np.argmax(keys, axis=1)
+    stale = ~mask.any(axis=1)
+    picks[stale] = np.argmin(last_seen[stale], axis=1)
+    return picks
+
+
+def eligible(pool: ItemPool, history, today) -> list:
+    """Eligible items in difficulty order."""
+    mask = eligible_mask(pool, last_seen_ordinals(pool, history), today.toordinal())
+    return [pool.items[i] for i in np.flatnonzero(mask)]
+
+
+def pick_item(pool: ItemPool, history, today, rng=random):
+    last_seen = last_seen_ordinals(pool, history)
+    return pool.items[pick_index(pool, last_seen, today.toordinal(), rng)]
+
+
+def recommend(content: EmotionContent, history, today, rng=random) -> tuple:
+    """(quote, challenge) for one emotion's content."""
+    return pick_item(content.quotes, history, today, rng), pick_item(content.challenges, history, today, rng)
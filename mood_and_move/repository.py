@@ -0,0 +1,140 @@
+"""Request-scoped access to one user's recent logs."""
+
+import datetime
+from typing import TYPE_CHECKING
+
+from .models import DASHBOARD_FIELDS, HISTORY_FIELDS, TODAY_FIELDS
+from .storage import Storage
+from .writebehind import WriteBehindQueue
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOG_WINDOW_DAYS = 120
+
+
+class LogRepository:
+    """One user's recent logs, loaded at most once per script run.
+
+    Today's row, the history and the dashboard window are all answered from
+    the same in-memory window. Writes go through the repository so the
+    window is dropped and re-read on the next access; `on_write` hooks run
+    after any write that changes `emotion` or `completed`.
+
+    With a `writes` queue, updates are queued instead of written inline and
+    still-pending values are overlaid on the fetched rows, so this process
+    reads its own writes before the queue has flushed them. Level points read
+    from the store are topped up by `points_adjustment`, which is only right
+    if no queued write landed between reading the window and the points —
+    `read_consistent` makes sure of that.
+    """
+
+    MAX_READ_ATTEMPTS = 3
+
+    AGGREGATE_FIELDS = {"emotion", "completed"}
+    # everything read from the window: today's row, history, dashboard
+    FIELD_GROUPS = (TODAY_FIELDS, HISTORY_FIELDS, DASHBOARD_FIELDS)
+
+    def __init__(self, store: Storage, user_id: str, days: int = LOG_WINDOW_DAYS, on_write=(),
+                 writes: WriteBehindQueue = None):
+        self.store = store
+        self.user_id = user_id
+        self.days = days
+        self.on_write = tuple(on_write)
+        self.writes = writes
+        self._server_rows = None
+        self._rows = None
+        self._df = None
+        self._history = None
+
+    def rows(self) -> list:
+        if self._rows is None:
+            self._server_rows = self.store.fetch_user_rows(self.user_id, days=self.days, fields=self.FIELD_GROUPS)
+            self._rows = [self._overlay(r) for r in self._server_rows]
+        return self._rows
+
+    def _overlay(self, row: dict) -> dict:
+        pending = self.writes.pending(row.get("id")) if self.writes else None
+        return {**row, **pending} if pending else row
+
+    def read_consistent(self, read):
+        """Run `read()`, which loads `rows()` and the stored points, with no write to them landing meanwhile.
+
+        A queued write to one of the window's rows that lands mid-read is in
+        the points but not the window (or the other way round), so the window
+        is dropped and both are read again; after `MAX_READ_ATTEMPTS` the last
+        result is used as is. Never waits on the queue.
+        """
+        if not self.writes:
+            return read()
+        for attempt in range(1, self.MAX_READ_ATTEMPTS + 1):
+            seq = self.writes.write_seq()
+            result = read()
+            row_ids = [r.get("id") for r in self._server_rows or ()]
+            if attempt == self.MAX_READ_ATTEMPTS or not self.writes.wrote_since(seq, row_ids):
+                return result
+            self.invalidate()
+
+    def points_adjustment(self) -> dict:
+        """Per-emotion points queued after the window was read, to add to the stored level points."""
+        adj = {}
+        for server, row in zip(self._server_rows or [], self._rows or []):
+            delta = int(row.get("points_delta") or 0) - int(server.get("points_delta") or 0)
+            if delta and row.get("emotion"):
+                adj[row["emotion"]] = adj.get(row["emotion"], 0) + delta
+        return adj
+
+    def frame(self, days: int = None) -> "pd.DataFrame":
+        if self._df is None:
+            import pandas as pd
+
+            self._df = pd.DataFrame(self.rows())
+        if days is None or days >= self.days or self._df.empty:
+            return self._df
+        since = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+        return self._df[self._df["log_date"].astype(str) >= since]
+
+    def history(self) -> dict:
+        """Item id -> last date shown, for `pick_item`; built on first use only."""
+        if self._history is None:
+            from .history import build_history_from_df
+
+            self._history = build_history_from_df(self.frame())
+        return self._history
+
+    def today_row(self, day: str):
+        return next((r for r in self.rows() if str(r.get("log_date")) == day), None)
+
+    def submit_today_row(self, day: str, payload: dict) -> tuple:
+        """`Storage.submit_log` for this user: `(stored row, created)`."""
+        row, created = self.store.submit_log(self.user_id, day, payload)
+        self.invalidate()
+        if created:
+            self._notify_write()
+        return row, created
+
+    def update_row(self, row_id: int, payload: dict):
+        if self.writes:
+            self.writes.submit(row_id, payload)
+            if self._rows is not None:
+                # overlay the new values on the rows already read instead of
+                # re-fetching (the store may not have them yet) or re-reading the
+                # queue (a write it finished meanwhile is not in the points read)
+                self._rows = [{**r, **payload} if r.get("id") == row_id else r for r in self._rows]
+                self._df = None
+                self._history = None
+        else:
+            self.store.update_log(row_id, payload)
+            self.invalidate()
+        if self.AGGREGATE_FIELDS & payload.keys():
+            self._notify_write()
+
+    def _notify_write(self):
+        for hook in self.on_write:
+            hook()
+
+    def invalidate(self):
+        self._server_rows = None
+        self._rows = None
+        self._df = None
+        self._history = None
@@ -0,0 +1,50 @@
+"""Backfill command for the `daily_emotion_rollup` table.
+
+The rollup is kept current by triggers on `logs`; this rebuilds it from scratch
+(or for a date range) after a bulk import or if it ever drifts:
+
+    SUPABASE_URL=... SUPABASE_SERVICE_ROLE_KEY=... \
+        python -m mood_and_move.rollup --since 2026-01-01 --chunk-days 30
+"""
+
+import argparse
+import datetime
+
+from .cli import client_from_env
+
+
+def date_chunks(since: datetime.date, until: datetime.date, chunk_days: int):
+    """Half-open [start, end) windows covering [since, until)."""
+    start = since
+    while start < until:
+        end = min(until, start + datetime.timedelta(days=chunk_days))
+        yield start, end
+        start = end
+
+
+def rebuild(sb, since: datetime.date = None, until: datetime.date = None, chunk_days: int = None) -> int:
+    """Rebuild the rollup, optionally in `chunk_days` slices to keep each lock short."""
+    if since is None or not chunk_days:
+        params = {"since": since and since.isoformat(), "until": until and until.isoformat()}
+        return int(sb.rpc("rebuild_daily_emotion_rollup", params).execute().data or 0)
+    until = until or (datetime.date.today() + datetime.timedelta(days=1))
+    total = 0
+    for start, end in date_chunks(since, until, chunk_days):
+        params = {"since": start.isoformat(), "until": end.isoformat()}
+        total += int(sb.rpc("rebuild_daily_emotion_rollup", params).execute().data or 0)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild daily_emotion_rollup from logs.")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, help="first log_date to rebuild (inclusive)")
+    parser.add_argument("--until", type=datetime.date.fromisoformat, help="last log_date to rebuild (exclusive)")
+    parser.add_argument("--chunk-days", type=int, default=None, help="rebuild in slices of this many days")
+    args = parser.parse_args(argv)
+
+    n = rebuild(client_from_env(), args.since, args.until, args.chunk_days)
+    print(f"daily_emotion_rollup: {n} rows rebuilt")
+
+
+if __name__ == "__main__":
+    main()
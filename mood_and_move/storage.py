@@ -0,0 +1,480 @@
+"""Persistence backends for users and logs.
+
+`Storage` is the interface the app talks to. `SupabaseStorage` wraps a
+supabase-py client (PostgREST over HTTPS); `SQLiteStorage` is an in-process
+implementation with the same schema, triggers and aggregates, for load tests,
+benchmarks and small single-host deployments.
+"""
+
+import abc
+import contextlib
+import datetime
+import queue
+import sqlite3
+import threading
+import uuid
+
+from .models import GLOBAL_FIELDS, LOG_FIELDS, TODAY_FIELDS, log_columns, user_columns
+
+
+def since_iso(days: int) -> str:
+    return (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+
+
+def aggregate_emotions(rows) -> list:
+    """Python equivalent of the `emotion_distribution` RPC over raw log rows."""
+    agg = {}
+    for r in rows:
+        emo = r.get("emotion")
+        if emo is None:
+            continue
+        n, done = agg.get(emo, (0, 0))
+        agg[emo] = (n + 1, done + int(bool(r.get("completed"))))
+    return [{"emotion": e, "n": n, "n_completed": done} for e, (n, done) in agg.items()]
+
+
+class Storage(abc.ABC):
+    page_size = 1000  # rows per keyset page; keep at or below PostgREST's max-rows
+
+    @abc.abstractmethod
+    def upsert_user(self, username: str) -> dict:
+        """Return the user row for `username`, creating it if needed."""
+
+    @abc.abstractmethod
+    def find_user(self, username: str):
+        """The user row for `username`, or None; never creates one."""
+
+    @abc.abstractmethod
+    def resolve_users(self, usernames) -> dict:
+        """Map every username to its user id, creating missing users in bulk."""
+
+    def fetch_user_rows(self, user_id: str, days: int = 120, fields=(TODAY_FIELDS,)) -> list:
+        """The user's logs from the last `days` days ordered by `(log_date, id)`.
+
+        Concatenated from keyset pages, so a server-side row cap can never
+        silently truncate the window.
+        """
+        return [row for page in self.iter_user_pages(user_id, fields, since=since_iso(days)) for row in page]
+
+    @abc.abstractmethod
+    def fetch_user_page(self, user_id: str, fields, after=None, since: str = None, limit: int = 1000) -> list:
+        """Up to `limit` of the user's logs ordered by `(log_date, id)`.
+
+        `after` is the `(log_date, id)` key of the last row already seen
+        (keyset pagination); `fields` must include `log_date` and `id`.
+        """
+
+    def iter_user_pages(self, user_id: str, fields=(LOG_FIELDS,), since: str = None, page_size: int = None):
+        """Yield the user's logs page by page, holding one page in memory at a time."""
+        page_size = page_size or self.page_size
+        fields = (("id", "log_date"),) + tuple(fields)
+        after = None
+        while True:
+            page = self.fetch_user_page(user_id, fields, after=after, since=since, limit=page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1]["log_date"], page[-1]["id"])
+
+    @abc.abstractmethod
+    def submit_log(self, user_id: str, day: str, payload: dict) -> tuple:
+        """Write the user's row for `day` unless one exists; return `(stored row, created)`.
+
+        Idempotent on `(user_id, log_date)`: the first submission of the day
+        wins (`created` True) and later ones get that row back unchanged.
+        """
+
+    @abc.abstractmethod
+    def insert_logs(self, rows) -> int:
+        """Multi-row insert that skips rows whose `(user_id, log_date)` exists.
+
+        Returns the number of rows actually inserted.
+        """
+
+    def update_log(self, row_id: int, payload: dict) -> None:
+        self.update_logs([row_id], payload)
+
+    @abc.abstractmethod
+    def update_logs(self, row_ids, payload: dict) -> None:
+        """Apply the same `payload` to every row in `row_ids`."""
+
+    @abc.abstractmethod
+    def emotion_points(self, user_id: str) -> dict:
+        """Lifetime level points per emotion."""
+
+    @abc.abstractmethod
+    def emotion_distribution(self, days: int) -> list:
+        """Per-emotion `n` / `n_completed` across all users for the last `days` days."""
+
+
+# ---------- Supabase ----------
+USERNAME_CHUNK = 200  # usernames per `in.(...)` filter, keeps the request URL short
+
+
+def _after_key(query, after):
+    """PostgREST filter for rows strictly after the `(log_date, id)` key."""
+    if not after:
+        return query
+    log_date, row_id = after
+    return query.or_(f"log_date.gt.{log_date},and(log_date.eq.{log_date},id.gt.{row_id})")
+
+
+class SupabaseStorage(Storage):
+    def __init__(self, client, page_size: int = Storage.page_size):
+        self.sb = client
+        self.page_size = page_size
+
+    def upsert_user(self, username: str) -> dict:
+        # insert ... on conflict do nothing, never an UPDATE (anon has no update
+        # policy on users); existing users are read first, and read again if a
+        # concurrent login won the insert
+        user = self.find_user(username)
+        if user is None:
+            res = self.sb.table("users").upsert(
+                {"username": username}, on_conflict="username", ignore_duplicates=True).execute()
+            user = res.data[0] if res.data else self.find_user(username)
+        return user
+
+    def find_user(self, username: str):
+        res = self.sb.table("users").select(user_columns()).eq("username", username).limit(1).execute()
+        return res.data[0] if res.data else None
+
+    def resolve_users(self, usernames) -> dict:
+        payload = [{"username": u} for u in dict.fromkeys(usernames)]
+        if not payload:
+            return {}
+        # inserted rows come back; existing ones are skipped and looked up
+        res = self.sb.table("users").upsert(payload, on_conflict="username", ignore_duplicates=True).execute()
+        found = {r["username"]: r["id"] for r in res.data}
+        missing = [p["username"] for p in payload if p["username"] not in found]
+        for i in range(0, len(missing), USERNAME_CHUNK):
+            chunk = missing[i:i + USERNAME_CHUNK]
+            rows = self.sb.table("users").select("id, username").in_("username", chunk).execute().data
+            found.update({r["username"]: r["id"] for r in rows})
+        return found
+
+    def _logs_query(self, fields, since, after, count: bool, user_id: str = None):
+        from postgrest.types import CountMethod
+
+        query = self.sb.table("logs").select(log_columns(*fields), count=CountMethod.exact if count else None)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        if since:
+            query = query.gte("log_date", since)
+        return _after_key(query, after).order("log_date").order("id")
+
+    def _keyset_pages(self, fields, since=None, user_id=None, page_size=None):
+        # PostgREST may return fewer rows than `limit` (max-rows), so a short page
+        # does not mean the end: the first page carries an exact count instead
+        page_size = page_size or self.page_size
+        fields = (("id", "log_date"),) + tuple(fields)
+        total, seen, after = None, 0, None
+        while total is None or seen < total:
+            res = self._logs_query(fields, since, after, count=total is None, user_id=user_id).limit(page_size).execute()
+            page = res.data or []
+            if total is None:
+                total = res.count if res.count is not None else float("inf")
+            if not page:
+                return
+            yield page
+            seen += len(page)
+            after = (page[-1]["log_date"], page[-1]["id"])
+
+    def fetch_user_page(self, user_id: str, fields, after=None, since: str = None, limit: int = 1000) -> list:
+        return self._logs_query(fields, since, after, count=False, user_id=user_id).limit(limit).execute().data or []
+
+    def iter_user_pages(self, user_id: str, fields=(LOG_FIELDS,), since: str = None, page_size: int = None):
+        return self._keyset_pages(fields, since=since, user_id=user_id, page_size=page_size)
+
+    def submit_log(self, user_id: str, day: str, payload: dict) -> tuple:
+        # one round trip; the unique (user_id, log_date) index turns a second
+        # tab's insert into a no-op, and only then do we read the winner back
+        payload = {"user_id": user_id, "log_date": day, **payload}
+        res = (self.sb.table("logs")
+               .upsert(payload, on_conflict="user_id,log_date", ignore_duplicates=True)
+               .execute())
+        if res.data:
+            return res.data[0], True
+        res = (self.sb.table("logs").select(log_columns(LOG_FIELDS))
+               .eq("user_id", user_id).eq("log_date", day).limit(1).execute())
+        return res.data[0], False
+
+    def insert_logs(self, rows) -> int:
+        from postgrest.types import CountMethod, ReturnMethod
+
+        rows = list(rows)
+        if not rows:
+            return 0
+        res = (self.sb.table("logs")
+               .upsert(rows, on_conflict="user_id,log_date", ignore_duplicates=True,
+                       returning=ReturnMethod.minimal, count=CountMethod.exact, default_to_null=False)
+               .execute())
+        return int(res.count or 0)
+
+    def update_logs(self, row_ids, payload: dict) -> None:
+        from postgrest.types import ReturnMethod
+
+        row_ids = list(row_ids)
+        query = self.sb.table("logs").update(payload, returning=ReturnMethod.minimal)
+        query = query.eq("id", row_ids[0]) if len(row_ids) == 1 else query.in_("id", row_ids)
+        query.execute()
+
+    def emotion_points(self, user_id: str) -> dict:
+        res = self.sb.table("user_emotion_points").select("emotion, points").eq("user_id", user_id).execute()
+        return {r["emotion"]: int(r["points"]) for r in (res.data or [])}
+
+    def emotion_distribution(self, days: int) -> list:
+        # six rows from the `emotion_distribution` function (supabase/migrations);
+        # clients without `rpc` fall back to aggregating raw rows here
+        since = since_iso(days)
+        if hasattr(self.sb, "rpc"):
+            return self.sb.rpc("emotion_distribution", {"since": since}).execute().data or []
+        pages = self._keyset_pages((GLOBAL_FIELDS,), since=since)
+        return aggregate_emotions(row for page in pages for row in page)
+
+
+# ---------- SQLite ----------
+SQLITE_SCHEMA = """
+create table if not exists users (
+  id       text primary key,
+  username text not null unique
+);
+
+create table if not exists logs (
+  id           integer primary key autoincrement,
+  user_id      text    not null references users (id) on delete cascade,
+  log_date     text    not null,
+  emotion      text,
+  choice_key   text,
+  question_id  text,
+  quote_id     text,
+  challenge_id text,
+  completed    integer not null default 0,
+  points_delta integer not null default 0
+);
+create unique index if not exists logs_user_date_key on logs (user_id, log_date);
+create index if not exists logs_log_date_idx on logs (log_date);
+
+create table if not exists daily_emotion_rollup (
+  log_date    text    not null,
+  emotion     text    not null,
+  n           integer not null default 0,
+  n_completed integer not null default 0,
+  primary key (log_date, emotion)
+);
+
+create table if not exists user_emotion_points (
+  user_id text    not null,
+  emotion text    not null,
+  points  integer not null default 0,
+  primary key (user_id, emotion)
+);
+
+create trigger if not exists logs_ai after insert on logs when new.emotion is not null begin
+  insert into daily_emotion_rollup (log_date, emotion, n, n_completed)
+  values (new.log_date, new.emotion, 1, new.completed <> 0)
+  on conflict (log_date, emotion) do update
+    set n = n + 1, n_completed = n_completed + excluded.n_completed;
+  insert into user_emotion_points (user_id, emotion, points)
+  values (new.user_id, new.emotion, new.points_delta)
+  on conflict (user_id, emotion) do update set points = points + excluded.points;
+end;
+
+create trigger if not exists logs_ad after delete on logs when old.emotion is not null begin
+  update daily_emotion_rollup
+     set n = n - 1, n_completed = n_completed - (old.completed <> 0)
+   where log_date = old.log_date and emotion = old.emotion;
+  update user_emotion_points set points = points - old.points_delta
+   where user_id = old.user_id and emotion = old.emotion;
+end;
+
+create trigger if not exists logs_au after update of emotion, completed, log_date, points_delta, user_id on logs
+begin
+  update daily_emotion_rollup
+     set n = n - 1, n_completed = n_completed - (old.completed <> 0)
+   where old.emotion is not null and log_date = old.log_date and emotion = old.emotion;
+  update user_emotion_points set points = points - old.points_delta
+   where old.emotion is not null and user_id = old.user_id and emotion = old.emotion;
+  insert into daily_emotion_rollup (log_date, emotion, n, n_completed)
+  select new.log_date, new.emotion, 1, new.completed <> 0 where new.emotion is not null
+  on conflict (log_date, emotion) do update
+    set n = n + 1, n_completed = n_completed + excluded.n_completed;
+  insert into user_emotion_points (user_id, emotion, points)
+  select new.user_id, new.emotion, new.points_delta where new.emotion is not null
+  on conflict (user_id, emotion) do update set points = points + excluded.points;
+end;
+"""
+
+
+def _log_row(row: sqlite3.Row) -> dict:
+    d = dict(row)
+    if "completed" in d:
+        d["completed"] = bool(d["completed"])
+    return d
+
+
+class SQLiteStorage(Storage):
+    """SQLite in WAL mode behind a small connection pool shared across threads."""
+
+    def __init__(self, path: str, pool_size: int = 4, page_size: int = Storage.page_size):
+        self.path = str(path)
+        self.page_size = page_size
+        self._pool = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.pool_size = pool_size
+        with self._conn() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("pragma journal_mode = wal")
+        conn.execute("pragma synchronous = normal")
+        conn.execute("pragma foreign_keys = on")
+        return conn
+
+    @contextlib.contextmanager
+    def _conn(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            conn = self._connect() if grow else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextlib.contextmanager
+    def _tx(self):
+        with self._conn() as conn:
+            conn.execute("begin immediate")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("rollback")
+                raise
+            conn.execute("commit")
+
+    def upsert_user(self, username: str) -> dict:
+        sql = ("insert into users (id, username) values (?, ?) "
+               "on conflict (username) do update set username = excluded.username "
+               f"returning {user_columns()}")
+        with self._tx() as conn:
+            return dict(conn.execute(sql, (str(uuid.uuid4()), username)).fetchone())
+
+    def find_user(self, username: str):
+        with self._conn() as conn:
+            row = conn.execute(f"select {user_columns()} from users where username = ?", (username,)).fetchone()
+        return dict(row) if row else None
+
+    def resolve_users(self, usernames) -> dict:
+        names = list(dict.fromkeys(usernames))
+        if not names:
+            return {}
+        with self._tx() as conn:
+            conn.executemany(
+                "insert into users (id, username) values (?, ?) on conflict (username) do nothing",
+                [(str(uuid.uuid4()), u) for u in names],
+            )
+            found = {}
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                sql = f"select id, username from users where username in ({', '.join('?' * len(chunk))})"
+                found.update({r["username"]: r["id"] for r in conn.execute(sql, chunk)})
+        return found
+
+    def fetch_user_page(self, user_id: str, fields, after=None, since: str = None, limit: int = 1000) -> list:
+        where, params = ["user_id = ?"], [user_id]
+        if since:
+            where.append("log_date >= ?")
+            params.append(since)
+        if after:
+            where.append("(log_date, id) > (?, ?)")
+            params.extend(after)
+        sql = (f"select {log_columns(*fields)} from logs where {' and '.join(where)} "
+               "order by log_date, id limit ?")
+        with self._conn() as conn:
+            return [_log_row(r) for r in conn.execute(sql, params + [limit])]
+
+    def submit_log(self, user_id: str, day: str, payload: dict) -> tuple:
+        row = {"user_id": user_id, "log_date": day, **payload}
+        cols = _checked_fields(row)
+        sql = (f"insert into logs ({', '.join(cols)}) values ({', '.join('?' * len(cols))}) "
+               f"on conflict (user_id, log_date) do nothing returning {log_columns(LOG_FIELDS)}")
+        with self._tx() as conn:
+            stored = conn.execute(sql, [row[c] for c in cols]).fetchone()
+            created = stored is not None
+            if not created:
+                stored = conn.execute(
+                    f"select {log_columns(LOG_FIELDS)} from logs where user_id = ? and log_date = ?",
+                    (user_id, day),
+                ).fetchone()
+        return _log_row(stored), created
+
+    def insert_logs(self, rows) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        cols = _checked_fields({k: None for r in rows for k in r})
+        sql = (f"insert into logs ({', '.join(cols)}) values ({', '.join('?' * len(cols))}) "
+               "on conflict (user_id, log_date) do nothing")
+        defaults = {"completed": False, "points_delta": 0}
+        values = [[r.get(c, defaults.get(c)) for c in cols] for r in rows]
+        with self._tx() as conn:
+            # rowcount sums direct inserts only, not the rollup/points trigger writes
+            return conn.executemany(sql, values).rowcount
+
+    def update_logs(self, row_ids, payload: dict) -> None:
+        cols = _checked_fields(payload)
+        row_ids = list(row_ids)
+        if not cols or not row_ids:
+            return
+        sql = (f"update logs set {', '.join(f'{c} = ?' for c in cols)} "
+               f"where id in ({', '.join('?' * len(row_ids))})")
+        with self._tx() as conn:
+            conn.execute(sql, [payload[c] for c in cols] + row_ids)
+
+    def emotion_points(self, user_id: str) -> dict:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "select emotion, points from user_emotion_points where user_id = ?", (user_id,)
+            ).fetchall()
+        return {r["emotion"]: int(r["points"]) for r in rows}
+
+    def emotion_distribution(self, days: int) -> list:
+        sql = ("select emotion, sum(n) as n, sum(n_completed) as n_completed "
+               "from daily_emotion_rollup where log_date >= ? "
+               "group by emotion having sum(n) > 0")
+        with self._conn() as conn:
+            return [dict(r) for r in conn.execute(sql, (since_iso(days),))]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _checked_fields(payload: dict) -> list:
+    unknown = set(payload) - set(LOG_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown log columns: {sorted(unknown)}")
+    return list(payload)
+
+
+def make_storage(backend: str = "supabase", **options) -> Storage:
+    """Build the configured backend: `supabase` (needs `client`) or `sqlite` (needs `path`)."""
+    page_size = int(options.get("page_size") or Storage.page_size)
+    if backend == "supabase":
+        return SupabaseStorage(options["client"], page_size=page_size)
+    if backend == "sqlite":
+        return SQLiteStorage(options["path"], pool_size=options.get("pool_size", 4), page_size=page_size)
+    raise ValueError(f"unknown storage backend: {backend}")
@@ -0,0 +1,236 @@
+"""Write-behind queue for non-critical `logs` updates.
+
+Updates are merged per row id in memory and written by a background worker,
+so the click that produced them does not wait on the backend. A flush happens
+every `flush_interval` seconds or as soon as `batch_size` rows are pending;
+rows whose merged payloads are identical go out as one `update_logs` call.
+`pending(row_id)` exposes not-yet-written values so readers can overlay them
+(read-your-writes within this process); `write_seq` / `wrote_since` tell a
+reader whether a write to its rows landed while it was reading. Batches are taken and written under one
+lock, so a `flush()` on a script thread never races the worker with an older
+payload for the same row. A row whose write fails is retried with
+exponential backoff (`retry_base` doubling up to `retry_max` seconds) and
+only dropped once it has kept failing for `give_up_after` seconds, so a short
+backend outage delays saves instead of losing them. `close()` drains
+everything, trying backed-off rows once more, and is registered with `atexit`.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+WRITTEN_SEQ_SIZE = 10_000  # rows remembered for `wrote_since`
+
+
+class WriteBehindQueue:
+    def __init__(self, store, flush_interval: float = 0.5, batch_size: int = 100,
+                 max_pending: int = 1000, retry_base: float = 1.0, retry_max: float = 60.0,
+                 give_up_after: float = 600.0, on_flush=(), clock=time.monotonic):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.give_up_after = give_up_after
+        self.on_flush = tuple(on_flush)
+        self._clock = clock
+        self._pending = OrderedDict()  # row_id -> merged payload
+        self._inflight = {}  # row_id -> payload currently being written
+        self._attempts = {}  # row_id -> failed writes in a row
+        self._failing_since = {}  # row_id -> clock() of its first failed write
+        self._retry_at = {}  # row_id -> clock() before which it is not retried
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._write_seq = 0  # +1 before and after every update_logs call
+        self._writing = frozenset()  # row ids of the update_logs call in progress
+        self._written_seq = OrderedDict()  # row_id -> _write_seq its last write ended at, oldest first
+        self._forgotten_seq = 0  # newest _write_seq evicted from _written_seq
+        self._closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    # ---------- producer side ----------
+    def submit(self, row_id, payload: dict):
+        """Queue `payload` for `row_id`, merging with anything still pending for it.
+
+        When `max_pending` rows are waiting the caller blocks until the worker
+        catches up, which bounds memory under a write burst.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            while row_id not in self._pending and len(self._pending) >= self.max_pending:
+                self._cond.notify_all()
+                self._cond.wait()
+            self.submitted += 1
+            if row_id in self._pending:
+                self.coalesced += 1
+                self._pending[row_id] = {**self._pending[row_id], **payload}
+            else:
+                self._pending[row_id] = dict(payload)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def pending(self, row_id):
+        """Values queued or being written for `row_id`, or None."""
+        with self._cond:
+            payload = {**self._inflight.get(row_id, {}), **self._pending.get(row_id, {})}
+            return payload or None
+
+    def write_seq(self) -> int:
+        """Current write sequence number, to pass to `wrote_since` later; never blocks."""
+        with self._cond:
+            return self._write_seq
+
+    def wrote_since(self, seq: int, row_ids) -> bool:
+        """Whether a write to any of `row_ids` was running, or ended, after `write_seq()` gave `seq`.
+
+        Only those rows count, so writes for other users never force a re-read.
+        """
+        with self._cond:
+            if self._forgotten_seq > seq:
+                return True
+            return any(r in self._writing or self._written_seq.get(r, -1) > seq for r in row_ids)
+
+    def flush(self):
+        """Write everything pending now, on the calling thread; rows backing off after a failure wait."""
+        while self._flush_batch(len(self._pending) or 1):
+            pass
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=30)
+        with self._cond:
+            self._retry_at.clear()  # last chance for rows backing off
+        self.flush()
+        with self._cond:
+            if self._pending:
+                self.dropped += len(self._pending)
+                log.error("write-behind closed with %d updates unwritten: %s", len(self._pending), dict(self._pending))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "retrying": len(self._retry_at),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+            }
+
+    # ---------- worker side ----------
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and self._ready() < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            while self._flush_batch(self.batch_size):
+                if self._ready() < self.batch_size:
+                    break
+
+    def _ready(self) -> int:
+        """Pending rows not backing off (approximately: some back-offs may have expired)."""
+        return len(self._pending) - len(self._retry_at)
+
+    def _flush_batch(self, n: int) -> bool:
+        with self._flush_lock:
+            return self._write_batch(self._take(n))
+
+    def _take(self, n: int) -> list:
+        with self._cond:
+            batch, now = [], self._clock()
+            for row_id in list(self._pending):
+                if len(batch) >= n:
+                    break
+                if self._retry_at.get(row_id, now) > now:
+                    continue
+                self._retry_at.pop(row_id, None)
+                payload = self._pending.pop(row_id)
+                self._inflight[row_id] = payload
+                batch.append((row_id, payload))
+            self._cond.notify_all()
+            return batch
+
+    def _write_batch(self, batch) -> bool:
+        if not batch:
+            return False
+        groups = {}
+        for row_id, payload in batch:
+            groups.setdefault(tuple(sorted(payload.items())), []).append(row_id)
+        for items, row_ids in groups.items():
+            payload = dict(items)
+            with self._cond:
+                self._write_seq += 1
+                self._writing = frozenset(row_ids)
+            try:
+                self.store.update_logs(row_ids, payload)
+            except Exception:
+                log.exception("write-behind update of %d rows failed", len(row_ids))
+                self._requeue(row_ids, payload)
+                continue
+            finally:
+                with self._cond:
+                    self._write_seq += 1
+                    self._writing = frozenset()
+                    for row_id in row_ids:
+                        self._written_seq[row_id] = self._write_seq
+                        self._written_seq.move_to_end(row_id)
+                    while len(self._written_seq) > WRITTEN_SEQ_SIZE:
+                        self._forgotten_seq = self._written_seq.popitem(last=False)[1]
+            with self._cond:
+                self.written += len(row_ids)
+                for row_id in row_ids:
+                    self._attempts.pop(row_id, None)
+                    self._failing_since.pop(row_id, None)
+                    self._inflight.pop(row_id, None)
+        with self._cond:
+            self.batches += 1
+        for hook in self.on_flush:
+            hook()
+        return True
+
+    def _requeue(self, row_ids, payload: dict):
+        with self._cond:
+            self.failures += 1
+            now = self._clock()
+            for row_id in row_ids:
+                self._inflight.pop(row_id, None)
+                attempts = self._attempts.get(row_id, 0) + 1
+                since = self._failing_since.setdefault(row_id, now)
+                if now - since >= self.give_up_after:
+                    self._attempts.pop(row_id, None)
+                    self._failing_since.pop(row_id, None)
+                    self.dropped += 1
+                    log.error("dropping write-behind update for log %s after %d attempts over %.0f s: %s",
+                              row_id, attempts, now - since, payload)
+                    continue
+                self._attempts[row_id] = attempts
+                self._retry_at[row_id] = now + min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+                # newer values submitted meanwhile win over the failed ones
+                self._pending[row_id] = {**payload, **self._pending.get(row_id, {})}
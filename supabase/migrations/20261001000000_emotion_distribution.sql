@@ -0,0 +1,22 @@
+-- Global "전체 감정 분포" aggregate for the dashboard step.
+-- Returns one row per emotion instead of shipping every log row to the app.
+
+create index if not exists logs_log_date_idx on public.logs (log_date);
+
+create or replace function public.emotion_distribution(since date)
+returns table (emotion text, n bigint, n_completed bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select l.emotion,
+         count(*)::bigint                              as n,
+         count(*) filter (where l.completed)::bigint   as n_completed
+  from public.logs l
+  where l.log_date >= since
+    and l.emotion is not null
+  group by l.emotion;
+$$;
+
+grant execute on function public.emotion_distribution(date) to anon, authenticated;
@@ -0,0 +1,116 @@
+-- Daily per-emotion rollup of public.logs, maintained by triggers.
+-- The global dashboard reads at most (days × emotions) rollup rows instead of
+-- scanning every log row in the window.
+
+create table if not exists public.daily_emotion_rollup (
+  log_date    date   not null,
+  emotion     text   not null,
+  n           bigint not null default 0,
+  n_completed bigint not null default 0,
+  primary key (log_date, emotion)
+);
+
+alter table public.daily_emotion_rollup enable row level security;
+
+drop policy if exists "rollup is readable" on public.daily_emotion_rollup;
+create policy "rollup is readable" on public.daily_emotion_rollup
+  for select to anon, authenticated using (true);
+
+-- ---------- Incremental maintenance ----------
+create or replace function public.daily_emotion_rollup_bump(
+  p_log_date date, p_emotion text, p_n integer, p_n_completed integer
+) returns void
+language sql
+security definer
+set search_path = public
+as $$
+  insert into public.daily_emotion_rollup as r (log_date, emotion, n, n_completed)
+  values (p_log_date, p_emotion, p_n, p_n_completed)
+  on conflict (log_date, emotion) do update
+    set n           = r.n + excluded.n,
+        n_completed = r.n_completed + excluded.n_completed;
+$$;
+
+create or replace function public.logs_rollup_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') and old.emotion is not null then
+    perform public.daily_emotion_rollup_bump(
+      old.log_date, old.emotion, -1, -(coalesce(old.completed, false))::int);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') and new.emotion is not null then
+    perform public.daily_emotion_rollup_bump(
+      new.log_date, new.emotion, 1, (coalesce(new.completed, false))::int);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists logs_rollup_insert_delete on public.logs;
+create trigger logs_rollup_insert_delete
+  after insert or delete on public.logs
+  for each row execute function public.logs_rollup_trigger();
+
+drop trigger if exists logs_rollup_update on public.logs;
+create trigger logs_rollup_update
+  after update of emotion, completed, log_date on public.logs
+  for each row
+  when (old.emotion   is distinct from new.emotion
+     or old.completed is distinct from new.completed
+     or old.log_date  is distinct from new.log_date)
+  execute function public.logs_rollup_trigger();
+
+-- ---------- Backfill ----------
+-- Rebuilds [since, until) from logs (either bound may be null). Writers are
+-- blocked for the duration so triggers cannot interleave with the rebuild.
+create or replace function public.rebuild_daily_emotion_rollup(
+  since date default null, until date default null
+) returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  affected bigint;
+begin
+  lock table public.logs in share mode;
+  delete from public.daily_emotion_rollup
+   where (since is null or log_date >= since)
+     and (until is null or log_date < until);
+  insert into public.daily_emotion_rollup (log_date, emotion, n, n_completed)
+  select l.log_date, l.emotion, count(*), count(*) filter (where l.completed)
+    from public.logs l
+   where l.emotion is not null
+     and (since is null or l.log_date >= since)
+     and (until is null or l.log_date < until)
+   group by l.log_date, l.emotion;
+  get diagnostics affected = row_count;
+  return affected;
+end;
+$$;
+
+revoke execute on function public.rebuild_daily_emotion_rollup(date, date) from public, anon, authenticated;
+revoke execute on function public.daily_emotion_rollup_bump(date, text, integer, integer) from public, anon, authenticated;
+
+select public.rebuild_daily_emotion_rollup();
+
+-- ---------- Dashboard aggregate now reads the rollup ----------
+create or replace function public.emotion_distribution(since date)
+returns table (emotion text, n bigint, n_completed bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select r.emotion,
+         sum(r.n)::bigint           as n,
+         sum(r.n_completed)::bigint as n_completed
+  from public.daily_emotion_rollup r
+  where r.log_date >= since
+  group by r.emotion
+  having sum(r.n) > 0;
+$$;
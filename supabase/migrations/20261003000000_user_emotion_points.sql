@@ -0,0 +1,73 @@
+-- Lifetime level points per user and emotion, maintained by triggers on logs.
+-- The sidebar reads six integers instead of summing 120 days of logs, and
+-- points older than that window keep counting towards levels.
+
+create table if not exists public.user_emotion_points (
+  user_id uuid   not null references public.users (id) on delete cascade,
+  emotion text   not null,
+  points  bigint not null default 0,
+  primary key (user_id, emotion)
+);
+
+alter table public.user_emotion_points enable row level security;
+
+drop policy if exists "points are readable" on public.user_emotion_points;
+create policy "points are readable" on public.user_emotion_points
+  for select to anon, authenticated using (true);
+
+create or replace function public.user_emotion_points_bump(
+  p_user_id uuid, p_emotion text, p_points integer
+) returns void
+language sql
+security definer
+set search_path = public
+as $$
+  insert into public.user_emotion_points as p (user_id, emotion, points)
+  values (p_user_id, p_emotion, p_points)
+  on conflict (user_id, emotion) do update
+    set points = p.points + excluded.points;
+$$;
+
+create or replace function public.logs_points_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE')
+     and old.emotion is not null and coalesce(old.points_delta, 0) <> 0 then
+    perform public.user_emotion_points_bump(old.user_id, old.emotion, -old.points_delta);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE')
+     and new.emotion is not null and coalesce(new.points_delta, 0) <> 0 then
+    perform public.user_emotion_points_bump(new.user_id, new.emotion, new.points_delta);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists logs_points_insert_delete on public.logs;
+create trigger logs_points_insert_delete
+  after insert or delete on public.logs
+  for each row execute function public.logs_points_trigger();
+
+drop trigger if exists logs_points_update on public.logs;
+create trigger logs_points_update
+  after update of points_delta, emotion, user_id on public.logs
+  for each row
+  when (old.points_delta is distinct from new.points_delta
+     or old.emotion      is distinct from new.emotion
+     or old.user_id      is distinct from new.user_id)
+  execute function public.logs_points_trigger();
+
+revoke execute on function public.user_emotion_points_bump(uuid, text, integer) from public, anon, authenticated;
+
+-- Backfill from the full history
+lock table public.logs in share mode;
+delete from public.user_emotion_points;
+insert into public.user_emotion_points (user_id, emotion, points)
+select l.user_id, l.emotion, sum(l.points_delta)
+  from public.logs l
+ where l.emotion is not null and coalesce(l.points_delta, 0) <> 0
+ group by l.user_id, l.emotion;
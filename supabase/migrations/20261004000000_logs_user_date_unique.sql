@@ -0,0 +1,13 @@
+-- One log row per user per day, enforced by the database so the app can
+-- submit today's answer as a single idempotent upsert
+-- (on_conflict = "user_id,log_date") instead of SELECT-then-INSERT.
+
+-- Keep the earliest row of any existing duplicates; the rollup and points
+-- triggers subtract the deleted rows.
+delete from public.logs l
+ using public.logs keep
+ where l.user_id  = keep.user_id
+   and l.log_date = keep.log_date
+   and l.id > keep.id;
+
+create unique index if not exists logs_user_date_key on public.logs (user_id, log_date);
@@ -0,0 +1,50 @@
+-- Usernames are the login key; a unique index lets the app create-or-fetch a
+-- user with one insert (on_conflict = "username", ignore duplicates) and no
+-- SELECT-then-INSERT race.
+
+-- Merge existing duplicates first. Each username keeps the id with the
+-- oldest log (then the lowest id); the other ids' logs move over to it.
+lock table public.users, public.logs in share row exclusive mode;
+
+create temporary table username_merge as
+select dup_id, keep_id
+  from (
+    select u.id as dup_id,
+           first_value(u.id) over (partition by u.username
+                                   order by f.first_log nulls last, u.id) as keep_id
+      from public.users u
+      left join (select user_id, min(log_date) as first_log
+                   from public.logs group by user_id) f on f.user_id = u.id
+  ) ranked
+ where dup_id <> keep_id;
+
+-- Moving logs must not break logs_user_date_key: on a day more than one of
+-- the merged ids answered, keep the kept id's row (else the earliest) and
+-- delete the rest; the rollup and points triggers subtract them.
+delete from public.logs l
+ using (
+   select l.id,
+          row_number() over (partition by coalesce(m.keep_id, l.user_id), l.log_date
+                             order by m.dup_id is not null, l.id) as rn
+     from public.logs l
+     left join username_merge m on m.dup_id = l.user_id
+    where l.user_id in (select dup_id from username_merge union select keep_id from username_merge)
+ ) ranked
+ where l.id = ranked.id
+   and ranked.rn > 1;
+
+-- logs_points_update moves each row's points from the duplicate to the kept
+-- id in user_emotion_points; the duplicates' (now zero) rows cascade away
+-- with their users.
+update public.logs l
+   set user_id = m.keep_id
+  from username_merge m
+ where l.user_id = m.dup_id;
+
+delete from public.users u
+ using username_merge m
+ where u.id = m.dup_id;
+
+drop table username_merge;
+
+create unique index if not exists users_username_key on public.users (username);